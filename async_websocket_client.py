@@ -0,0 +1,160 @@
+# async_websocket_client.py
+import asyncio
+import collections
+import os
+import random
+import threading
+import socketio
+from websocket_client import (WebSocketClient, SERVER_URL, RECONNECT_BASE_DELAY, RECONNECT_MAX_DELAY,
+                              MAX_BUFFERED_MESSAGES, AUDIO_CHUNK_BYTES, BATCH_THRESHOLD)
+
+
+class AsyncWebSocketClient(WebSocketClient):
+    """Drop-in replacement for WebSocketClient built on socketio.AsyncClient and one event loop thread.
+
+    All socket and outbox state lives on the loop thread; the public methods only schedule work
+    there, so the Tk and worker threads never block on network round-trips.
+    """
+
+    def __init__(self, on_message_callback, log_callback, server_url=SERVER_URL,
+                 max_buffered=MAX_BUFFERED_MESSAGES, spill_file=None, protocol="plain", batch_threshold=BATCH_THRESHOLD):
+        self.server_url = server_url
+        self.log_callback = log_callback
+        self.is_connected = False
+        self.should_connect = False
+        self.connect_task = None  # The single connect attempt allowed in flight
+
+        self.outbox = collections.deque()
+        self.replay = collections.deque()
+        self.max_buffered = max_buffered
+        self.spill_file = spill_file
+        self.spilled = os.path.exists(spill_file) and os.path.getsize(spill_file) > 0 if spill_file else False
+        self.spill_offset = 0
+        self.batch_threshold = batch_threshold
+        self.init_protocol(protocol)
+
+        self.loop = asyncio.new_event_loop()
+        self.outbox_ready = asyncio.Event()
+        self.sio = socketio.AsyncClient(reconnection=False)  # Reconnects are handled by connect_loop
+        self.on_message_callback = on_message_callback
+        self.sio.on("stt_transcription_update", self.on_update)
+        self.sio.on("connect", self.on_connect)
+        self.sio.on("disconnect", self.on_disconnect)
+        threading.Thread(target=self.run_loop, daemon=True).start()
+
+    @property
+    def connection_in_progress(self):
+        return self.connect_task is not None and not self.connect_task.done()
+
+    def run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.create_task(self.sender_loop())
+        self.loop.run_forever()
+
+    # Thread-safe API (called from the Tk and worker threads)
+
+    def connect_socket(self):
+        """Start connecting unless already connected or a connect is in flight."""
+        self.should_connect = True
+        self.loop.call_soon_threadsafe(self.start_connect)
+
+    def disconnect_socket(self):
+        """Disconnect from WebSocket."""
+        self.should_connect = False
+        asyncio.run_coroutine_threadsafe(self.disconnect(), self.loop)
+
+    def send_message(self, message, meta=None):
+        """Queue a message for ordered delivery; returns immediately."""
+        self.loop.call_soon_threadsafe(self.enqueue, self.wrap_message(message, meta))
+
+    def send_partial(self, utterance_id, text):
+        """Send an in-progress transcription; partials don't wait for each other."""
+        if self.is_connected:
+            asyncio.run_coroutine_threadsafe(
+                self.sio.emit("stt_partial", {"utterance_id": utterance_id, "text": text}), self.loop)
+
+    def send_audio(self, utterance_id, pcm, options):
+        """Stream an utterance's int16 PCM for remote transcription; returns False if the link is down."""
+        if not self.is_connected:
+            return False
+        future = asyncio.run_coroutine_threadsafe(self.emit_audio(utterance_id, pcm, options), self.loop)
+        try:
+            future.result()
+        except Exception as e:
+            self.log_callback(f"Sending audio failed: {e}")
+            return False
+        return True
+
+    # Loop-thread internals
+
+    async def emit_audio(self, utterance_id, pcm, options):
+        for seq, start in enumerate(range(0, len(pcm), AUDIO_CHUNK_BYTES)):
+            await self.sio.emit("stt_audio_chunk", {"utterance_id": utterance_id, "seq": seq,
+                                                    "pcm": pcm[start:start + AUDIO_CHUNK_BYTES]})
+        await self.sio.emit("stt_audio_end", {"utterance_id": utterance_id, "options": options})
+
+    def start_connect(self):
+        if self.is_connected or self.connection_in_progress:
+            return
+        self.connect_task = self.loop.create_task(self.connect_loop())
+
+    async def connect_loop(self):
+        attempt_count = 0
+        while self.should_connect:
+            try:
+                if attempt_count == 0:
+                    self.log_callback(f"Attempting to connect to {self.server_url}...")
+                else:
+                    self.log_callback(f"Retrying to connect to {self.server_url} (Attempt {attempt_count + 1})...")
+                await self.sio.connect(self.server_url)
+                self.log_callback(f"Connected to {self.server_url}")
+                return
+            except Exception as e:
+                self.log_callback(f"Connection failed: {e}")
+                attempt_count += 1
+                delay = random.uniform(0, min(RECONNECT_MAX_DELAY, RECONNECT_BASE_DELAY * 2 ** attempt_count))
+                self.log_callback(f"Retrying in {delay:.1f}s...")
+                await asyncio.sleep(delay)
+
+    async def disconnect(self):
+        if self.sio.connected:
+            await self.sio.disconnect()
+            self.is_connected = False
+            self.log_callback("Disconnected from server")
+
+    def on_connect(self):
+        self.is_connected = True
+        self.outbox_ready.set()
+
+    def on_disconnect(self, *args):
+        self.is_connected = False
+        self.requeue_unacked()
+        if self.should_connect:
+            self.log_callback("Lost connection to server, reconnecting...")
+            self.loop.call_later(RECONNECT_BASE_DELAY, self.start_connect)
+
+    def enqueue(self, message):
+        self.outbox.append(message)
+        if len(self.outbox) > self.max_buffered:
+            self.drop_oldest()
+        if not self.is_connected:
+            self.log_callback(f"Not connected, queued: {message} ({self.backlog()} waiting)")
+        self.outbox_ready.set()
+
+    async def sender_loop(self):
+        """Emit queued messages in order while connected, batching large backlogs."""
+        while True:
+            await self.outbox_ready.wait()
+            self.outbox_ready.clear()
+            while self.is_connected and self.backlog():
+                event, payload, messages = self.take_next()
+                try:
+                    data, callback = self.prepare_emit(messages, payload)
+                    await self.sio.emit(event, data, callback=callback)
+                except Exception as e:
+                    self.log_callback(f"Send failed ({e}), will retry after reconnecting.")
+                    self.retry(messages)
+                    self.is_connected = self.sio.connected
+                    await asyncio.sleep(RECONNECT_BASE_DELAY)
+                    continue
+                self.log_sent(payload)
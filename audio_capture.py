@@ -0,0 +1,222 @@
+# audio_capture.py
+import threading
+import numpy as np
+
+# Default capture settings (in seconds)
+DEFAULT_PRE_ROLL = 0.3  # Audio kept from before the key press so the first syllable isn't lost
+DEFAULT_MAX_UTTERANCE = 60.0  # Hard cap on the length of a single utterance
+BLOCK_DURATION = 0.1  # Size of each callback block
+
+
+class AudioCapture:
+    def __init__(self, sample_rate=16000, pre_roll=DEFAULT_PRE_ROLL, max_utterance=DEFAULT_MAX_UTTERANCE,
+                 device=None, stream_factory=None):
+        self.sample_rate = sample_rate
+        self.device = device
+        self.pre_roll_frames = int(pre_roll * sample_rate)
+        self.max_frames = int(max_utterance * sample_rate)
+        self.blocksize = int(BLOCK_DURATION * sample_rate)
+        self.stream_factory = stream_factory  # Swappable for a fake stream in tests; sounddevice if None
+
+        # Ring buffer sized for pre-roll plus two full utterances, so a returned view
+        # stays valid for at least one more max-length utterance of capture
+        self.capacity = self.pre_roll_frames + 2 * self.max_frames + self.blocksize
+        self.buffer = np.zeros(self.capacity, dtype=np.float32)
+        self.frames_written = 0  # Total frames written since start (monotonic)
+
+        self.stream = None
+        self.lock = threading.Lock()
+        self.data_ready = threading.Condition(self.lock)  # Notified whenever new frames are written
+        self.utterance_start = None  # Absolute frame index where the open utterance starts
+        self.on_write = None  # Optional tap called with every block written (e.g. a session recorder)
+        self.max_reached = threading.Event()  # Set when the current utterance hits the hard cap
+        self.on_max_reached = None  # Called (outside the lock) once the cap is hit, e.g. to split the utterance
+
+    def start(self, device=None):
+        """Open the input stream once and keep it running."""
+        if device is not None and device != self.device:
+            self.stop()
+            self.device = device
+        if self.stream is not None:
+            return
+        if self.stream_factory is None:
+            import sounddevice as sd  # Deferred so headless tools and tests don't need PortAudio
+            self.stream_factory = sd.InputStream
+        self.stream = self.stream_factory(
+            samplerate=self.sample_rate,
+            blocksize=self.blocksize,
+            device=self.device,
+            channels=1,
+            dtype="float32",
+            callback=self._callback,
+        )
+        self.stream.start()
+        print("Audio stream started.")
+
+    def stop(self):
+        """Stop and close the input stream."""
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+            print("Audio stream stopped.")
+        with self.data_ready:
+            self.data_ready.notify_all()
+
+    def _callback(self, indata, frames, time_info, status):
+        """Copy each incoming block into the ring buffer."""
+        if status:
+            print(f"Audio stream status: {status}")
+        self.write(indata[:, 0] if indata.ndim > 1 else indata)
+
+    def write(self, samples):
+        """Append mono float32 samples to the ring buffer."""
+        samples = samples[-self.capacity:]
+        n = len(samples)
+        capped = False
+        with self.lock:
+            pos = self.frames_written % self.capacity
+            first = min(n, self.capacity - pos)
+            self.buffer[pos:pos + first] = samples[:first]
+            if first < n:
+                self.buffer[:n - first] = samples[first:]
+            self.frames_written += n
+            if (self.utterance_start is not None and not self.max_reached.is_set()
+                    and self.frames_written - self.utterance_start >= self.max_frames):
+                self.max_reached.set()
+                capped = True
+            self.data_ready.notify_all()
+        if self.on_write:
+            self.on_write(samples)
+        if capped and self.on_max_reached:
+            self.on_max_reached()
+
+    def wait_for_frames(self, position, timeout=None):
+        """Block until frames past `position` are available; returns the current write position."""
+        with self.data_ready:
+            if self.frames_written <= position and self.stream is not None:
+                self.data_ready.wait(timeout)
+            return self.frames_written
+
+    def begin_utterance(self):
+        """Mark the start of an utterance, including the pre-roll."""
+        with self.lock:
+            self.utterance_start = max(0, self.frames_written - self.pre_roll_frames)
+            self.max_reached.clear()
+
+    def end_utterance(self, *args):
+        """Close the open utterance at the key release; returns its (start, end) frames, or None.
+
+        The span travels with the release event, so a new press can open the next utterance before
+        this one has been collected.
+        """
+        with self.lock:
+            if self.utterance_start is None:
+                return None
+            start = self.utterance_start
+            end = min(self.frames_written, start + self.max_frames)
+            self.utterance_start = None
+        return start, end
+
+    def split_utterance(self):
+        """Close the open utterance at the hard cap and continue it as a new one; returns the closed span.
+
+        The continuation starts exactly where the closed part ends (no pre-roll), so nothing is
+        decoded twice and nothing is lost.
+        """
+        with self.lock:
+            if self.utterance_start is None:
+                return None
+            start = self.utterance_start
+            end = min(self.frames_written, start + self.max_frames)
+            self.utterance_start = end
+            self.max_reached.clear()
+        return start, end
+
+    def get_range(self, start, end):
+        """Return frames [start, end) as a view into the ring buffer, or a single copy if it wraps."""
+        start = max(start, self.frames_written - self.capacity)
+        if end <= start:
+            return np.array([], dtype=np.float32)
+        first = start % self.capacity
+        last = first + (end - start)
+        if last <= self.capacity:
+            return self.buffer[first:last]
+        return np.concatenate((self.buffer[first:], self.buffer[:last - self.capacity]))
+
+
+class MultiCapture:
+    """Captures several input devices, or several channels of one device, at the same time.
+
+    Each source is a dict with an optional "device", "channel" (default 0) and "label". Sources on the
+    same device share one input stream opened with enough channels, and every source's channel goes
+    to its own AudioCapture ring buffer, so speakers are segmented separately.
+    """
+
+    def __init__(self, sources, sample_rate=16000, pre_roll=DEFAULT_PRE_ROLL, max_utterance=DEFAULT_MAX_UTTERANCE,
+                 stream_factory=None):
+        self.sample_rate = sample_rate
+        self.sources = [dict(source, label=source.get("label") or f"source {i + 1}", channel=source.get("channel", 0))
+                        for i, source in enumerate(sources)]
+        labels = [source["label"] for source in self.sources]
+        if len(set(labels)) != len(labels):
+            raise ValueError(f"Input source labels must be unique: {labels}")
+        self.captures = {label: AudioCapture(sample_rate, pre_roll=pre_roll, max_utterance=max_utterance)
+                         for label in labels}
+        self.stream_factory = stream_factory  # Swappable for a fake stream in tests; sounddevice if None
+        self.streams = []
+        self.data_ready = threading.Condition()  # Notified whenever any source receives frames
+
+    @property
+    def running(self):
+        return bool(self.streams)
+
+    def start(self):
+        """Open one input stream per device and keep them running."""
+        if self.streams:
+            return
+        if self.stream_factory is None:
+            import sounddevice as sd  # Deferred so headless tools and tests don't need PortAudio
+            self.stream_factory = sd.InputStream
+        devices = {}
+        for source in self.sources:
+            devices.setdefault(source.get("device"), []).append((source["channel"], self.captures[source["label"]]))
+        for device, targets in devices.items():
+            stream = self.stream_factory(
+                samplerate=self.sample_rate,
+                blocksize=int(BLOCK_DURATION * self.sample_rate),
+                device=device,
+                channels=max(channel for channel, _ in targets) + 1,
+                dtype="float32",
+                callback=self.make_callback(targets),
+            )
+            stream.start()
+            self.streams.append(stream)
+        print(f"Audio streams started for {len(self.sources)} sources on {len(devices)} devices.")
+
+    def make_callback(self, targets):
+        def callback(indata, frames, time_info, status):
+            if status:
+                print(f"Audio stream status: {status}")
+            for channel, capture in targets:
+                capture.write(indata[:, channel])
+            with self.data_ready:
+                self.data_ready.notify_all()
+        return callback
+
+    def stop(self):
+        """Stop and close all input streams."""
+        streams, self.streams = self.streams, []
+        for stream in streams:
+            stream.stop()
+            stream.close()
+        if streams:
+            print("Audio streams stopped.")
+        with self.data_ready:
+            self.data_ready.notify_all()
+
+    def wait(self, timeout=None):
+        """Block until any source receives new frames or capture stops."""
+        with self.data_ready:
+            if self.streams:
+                self.data_ready.wait(timeout)
@@ -0,0 +1,175 @@
+# batch.py
+import argparse
+import collections
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Audio files picked up when a directory is given
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".ogg", ".flac", ".webm", ".opus")
+
+# Per-process model, created once by init_worker
+worker_model = None
+
+
+def init_worker(model_size, cpu_threads):
+    """Load one CPU model per worker process."""
+    global worker_model
+    from model_manager import ModelManager
+    worker_model = ModelManager(device="cpu", compute_type="int8", cpu_threads=cpu_threads,
+                                idle_timeout=0).get(model_size)
+
+
+def transcribe_file(file_path):
+    """Decode one audio file in a worker process; returns the raw transcript and timings."""
+    from faster_whisper.audio import decode_audio
+
+    start = time.perf_counter()
+    audio = decode_audio(file_path, sampling_rate=16000)
+    segments, info = worker_model.transcribe(audio, beam_size=5)
+    text = " ".join(segment.text.strip() for segment in segments)
+    return {
+        "file": file_path,
+        "text": text,
+        "language": info.language,
+        "duration": round(len(audio) / 16000, 3),
+        "decode_time": round(time.perf_counter() - start, 3),
+    }
+
+
+def find_audio_files(source):
+    """Expand a directory or glob pattern into a sorted list of audio files."""
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(source)
+            for name in names if name.lower().endswith(AUDIO_EXTENSIONS)
+        )
+    return sorted(path for path in glob.glob(source, recursive=True) if os.path.isfile(path))
+
+
+def load_checkpoint(checkpoint_path):
+    """Return the set of files already completed in a previous run."""
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return set()
+    with open(checkpoint_path, "r", encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def run_batch(files, model_size="base", workers=None, postprocessor=None, on_result=None, checkpoint_path=None,
+              log=print):
+    """Transcribe files across a process pool, delivering results in submission order.
+
+    A file that fails to decode yields a {"file", "error"} result and is checkpointed like the others,
+    so a resume doesn't stop on it again.
+    """
+    workers = workers or os.cpu_count() or 1
+    cpu_threads = max(1, (os.cpu_count() or 1) // workers)  # Split cores so workers don't oversubscribe
+
+    done = load_checkpoint(checkpoint_path)
+    pending = [path for path in files if path not in done]
+    if done:
+        log(f"Resuming: {len(files) - len(pending)} of {len(files)} files already done.")
+    if not pending:
+        return 0
+
+    start = time.perf_counter()
+    audio_seconds = 0.0
+    failed = 0
+    checkpoint = open(checkpoint_path, "a", encoding="utf-8") if checkpoint_path else None
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(model_size, cpu_threads)) as pool:
+            # Keep a bounded window in flight and hand results out strictly in submission order
+            in_flight = collections.deque()
+            remaining = iter(pending)
+            for path in remaining:
+                in_flight.append((path, pool.submit(transcribe_file, path)))
+                if len(in_flight) >= workers * 2:
+                    break
+            while in_flight:
+                path, future = in_flight.popleft()
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    raise  # A worker died; the files in flight weren't done, so they stay unchecked
+                except Exception as e:
+                    log(f"{path}: transcription failed: {e}")
+                    result = {"file": path, "error": repr(e)}
+                    failed += 1
+                next_path = next(remaining, None)
+                if next_path is not None:
+                    in_flight.append((next_path, pool.submit(transcribe_file, next_path)))
+
+                if "error" not in result:
+                    if postprocessor:
+                        result["text"] = postprocessor(result["text"])
+                    audio_seconds += result["duration"]
+                if on_result:
+                    on_result(result)
+                if checkpoint:
+                    checkpoint.write(result["file"] + "\n")
+                    checkpoint.flush()
+                    os.fsync(checkpoint.fileno())
+    finally:
+        if checkpoint:
+            checkpoint.close()
+
+    elapsed = time.perf_counter() - start
+    log(f"Transcribed {len(pending)} files ({audio_seconds:.1f}s of audio) in {elapsed:.1f}s "
+        f"with {workers} workers ({audio_seconds / max(elapsed, 1e-6):.1f}x real time)"
+        + (f", {failed} failed." if failed else "."))
+    return len(pending)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transcribe pre-recorded audio files in parallel")
+    parser.add_argument("source", help="Directory or glob pattern of audio files")
+    parser.add_argument("--model", default="base", help="Whisper model size for the worker processes")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes (default: all cores)")
+    parser.add_argument("--jsonl", default=None, help="Append results to this JSONL file")
+    parser.add_argument("--send", action="store_true", help="Also send each result to the server")
+    parser.add_argument("--checkpoint", default=None, help="File recording completed inputs, for resuming")
+    parser.add_argument("--config", default="stt_config.json", help="Config file for post-processing and server")
+    args = parser.parse_args()
+
+    from config import load_config
+    from sttclient import build_postprocessor, build_websocket_client
+
+    config = load_config(args.config)
+    postprocessor = build_postprocessor(config)
+
+    websocket_client = None
+    if args.send:
+        websocket_client = build_websocket_client(config, lambda data: None, print)
+        websocket_client.connect_socket()
+    jsonl = open(args.jsonl, "a", encoding="utf-8") if args.jsonl else None
+
+    def on_result(result):
+        line = json.dumps(result, ensure_ascii=False)
+        if jsonl:
+            jsonl.write(line + "\n")
+            jsonl.flush()
+        else:
+            print(line)
+        if websocket_client and result.get("text"):
+            websocket_client.send_message(result["text"])
+
+    files = find_audio_files(args.source)
+    if not files:
+        raise SystemExit(f"No audio files found for {args.source}")
+    run_batch(files, args.model, args.workers, postprocessor, on_result, args.checkpoint)
+
+    if jsonl:
+        jsonl.close()
+    if websocket_client:
+        # Let the outbox drain before exiting (anything left is reported, not silently lost)
+        deadline = time.monotonic() + 30
+        while websocket_client.backlog() and time.monotonic() < deadline:
+            time.sleep(0.1)
+        if websocket_client.backlog():
+            print(f"{websocket_client.backlog()} results could not be sent.")
+        websocket_client.disconnect_socket()
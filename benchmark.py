@@ -0,0 +1,408 @@
+# benchmark.py
+import argparse
+import collections
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+
+# Pipeline stages reported by the replay benchmark
+STAGES = ("capture", "queue_wait", "decode", "postprocess", "emit", "total")
+
+# Startup import budget: the client modules must import within this time, without pulling in
+# the heavy dependencies (measured at ~430 ms, almost all numpy and python-socketio)
+IMPORT_BUDGET_MS = 600
+STARTUP_MODULES = ("sttclient", "transcriber", "pipeline", "websocket_client", "metrics", "vad")
+DEFERRED_MODULES = ("faster_whisper", "ctranslate2", "sounddevice", "pynput", "scipy", "tkinter")
+
+
+def time_call(func, repeat):
+    """Run func `repeat` times and return the per-call timings in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def percentiles(values):
+    """Summarize a list of timings in milliseconds."""
+    if not values:
+        return {}
+    values = np.asarray(values) * 1000
+    return {
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p95": round(float(np.percentile(values, 95)), 3),
+        "p99": round(float(np.percentile(values, 99)), 3),
+        "max": round(float(values.max()), 3),
+    }
+
+
+def max_rss_mb():
+    """Peak resident memory of this process in MB, or None where it can't be read (Windows)."""
+    try:
+        import resource  # Unix only
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)  # Bytes on macOS, KB on Linux
+
+
+def bench_handoff(seconds=10.0, sample_rate=16000, repeat=20):
+    """Compare the old temp-WAV round-trip with the in-memory handoff for one utterance."""
+    from scipy.io.wavfile import write
+    from faster_whisper.audio import decode_audio
+
+    recording = (np.random.default_rng(0).standard_normal(int(seconds * sample_rate)) * 0.1).astype(np.float32)
+
+    def temp_wav_round_trip():
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_wav:
+            write(temp_wav.name, sample_rate, recording)
+            file_path = temp_wav.name
+        decode_audio(file_path, sampling_rate=sample_rate)  # What faster-whisper does with a path
+        os.remove(file_path)
+
+    def in_memory():
+        np.ascontiguousarray(recording, dtype=np.float32).reshape(-1)
+
+    old = np.median(time_call(temp_wav_round_trip, repeat))
+    new = np.median(time_call(in_memory, repeat))
+    print(f"Utterance length: {seconds:.1f}s")
+    print(f"Temp WAV round-trip: {old:.3f} ms")
+    print(f"In-memory handoff:   {new:.3f} ms")
+    print(f"Saved per utterance: {old - new:.3f} ms")
+
+
+def bench_pipeline(wav_dir, model_size=None, speed=0.0, stub_rtf=0.05, port=5055, sample_rate=16000, max_queue=2,
+                   policy="block"):
+    """Replay WAV fixtures through the STTPipeline (capture, queues, decode, post-processing, emit); returns a report.
+
+    Each fixture is one push-to-talk utterance. Presses follow each other without waiting for the
+    decode, so queue waits and backpressure show up as they would live.
+    """
+    from audio_capture import AudioCapture
+    from fakes import FakeInputStream, FakeKeyListener, StubModel, read_wav
+    from local_server import LocalServer
+    from metrics import Tracer
+    from pipeline import STTPipeline
+    from transcriber import WhisperTranscriber
+    from websocket_client import WebSocketClient
+
+    files = sorted(glob.glob(os.path.join(wav_dir, "*.wav")))
+    if not files:
+        raise SystemExit(f"No WAV files found in {wav_dir}")
+
+    server = LocalServer(port=port)
+    server.start()
+    client = WebSocketClient(lambda data: None, lambda message: None, server_url=server.url)
+    client.connect_socket()
+    deadline = time.monotonic() + 10
+    while not client.is_connected and time.monotonic() < deadline:
+        time.sleep(0.05)
+    if not client.is_connected:
+        raise SystemExit("Could not connect to the local server")
+
+    transcriber = WhisperTranscriber(sample_rate=sample_rate, capture=AudioCapture(sample_rate, stream_factory=FakeInputStream))
+    transcriber.hotkey.listener_factory = FakeKeyListener
+    transcriber.hotkey.threshold = 0  # Replays can run faster than real time
+    capture = transcriber.capture
+    transcriber.hotkey.clock = lambda: capture.frames_written / capture.sample_rate
+    if model_size:
+        from model_manager import ModelManager
+        transcriber.model = ModelManager(device="cpu", compute_type="int8").get(model_size)
+    else:
+        stub = StubModel(rtf=stub_rtf, sample_rate=sample_rate)
+        texts = collections.deque()  # Sidecar texts, in decode order (one decode thread)
+        stub_transcribe = stub.transcribe
+
+        def transcribe(audio, **kwargs):
+            if texts:
+                stub.text = texts.popleft()
+            return stub_transcribe(audio, **kwargs)
+        stub.transcribe = transcribe
+        transcriber.model = stub
+
+    # Spans of sent utterances, in send order, so they line up with what the server receives
+    tracer = Tracer(enabled=True)
+    sent_spans = []
+    sends = []
+
+    def send(text, meta=None):
+        sends.append(text)
+        client.send_message(text, meta)
+
+    def finish(span):
+        if sends:
+            sends.clear()
+            sent_spans.append(span)
+    tracer.finish = finish
+    pipeline = STTPipeline(transcriber, transcriber.record_audio, send, lambda message: None,
+                           max_queue=max_queue, policy=policy, tracer=tracer)
+    pipeline.start()
+    while transcriber.capture.stream is None or transcriber.hotkey.listener is None:
+        time.sleep(0.01)  # The capture thread opens both on its first record call
+    stream = transcriber.capture.stream
+    key = transcriber.hotkey.keybind
+    released = {}  # Utterance index -> perf_counter time of the key release
+    audio_seconds = 0.0
+
+    for index, file_path in enumerate(files, 1):
+        samples = read_wav(file_path, sample_rate)
+        sidecar = os.path.splitext(file_path)[0] + ".txt"
+        if not model_size and os.path.exists(sidecar):
+            with open(sidecar) as f:
+                texts.append(f.read().strip())
+        audio_seconds += len(samples) / sample_rate
+        transcriber.hotkey.listener.press(key)
+        stream.feed(samples, speed)
+        released[index] = time.perf_counter()
+        transcriber.hotkey.listener.release(key)
+        if not speed:
+            # Unpaced, the ring buffer could otherwise wrap over an utterance before capture collects it
+            while not transcriber.hotkey.events.empty():
+                time.sleep(0.001)
+
+    deadline = time.monotonic() + 60
+    while not (pipeline.idle() and pipeline.count == len(files)) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    received = [server.wait_for("stt_transcription", timeout=10) for _ in sent_spans]
+    pipeline.stop()
+    client.disconnect_socket()
+    transcriber.stop_listening()
+    server.stop()
+
+    timings = {stage: [] for stage in STAGES}
+    rtfs = []
+    for span, message in zip(sent_spans, received):
+        if message is None:
+            raise SystemExit(f"Server never received the transcription of utterance #{span.utterance_id}")
+        marks = span.marks
+        received_at = message[0]
+        released_at = released[span.utterance_id]
+        timings["capture"].append(marks["capture_end"] - released_at)
+        timings["queue_wait"].append(marks["decode_start"] - marks["capture_end"])
+        timings["decode"].append(marks["decode_end"] - marks["decode_start"])
+        if "postprocess_start" in marks:  # Utterances skipped as silence send the prefix as is
+            timings["postprocess"].append(marks["postprocess_end"] - marks["postprocess_start"])
+        timings["emit"].append(received_at - marks["emit_start"])
+        timings["total"].append(received_at - released_at)
+        rtfs.append((marks["decode_end"] - marks["decode_start"]) / max(span.values["audio_duration"], 1e-6))
+
+    return {
+        "files": len(files),
+        "utterances_sent": len(sent_spans),
+        "audio_seconds": round(audio_seconds, 3),
+        "model": model_size or f"stub (rtf={stub_rtf})",
+        "pipeline": {"max_queue": max_queue, "policy": policy},
+        "latency_ms": {stage: percentiles(values) for stage, values in timings.items()},
+        "rtf": {
+            "mean": round(float(np.mean(rtfs)), 4) if rtfs else None,
+            "p95": round(float(np.percentile(rtfs, 95)), 4) if rtfs else None,
+        },
+        "max_rss_mb": max_rss_mb(),
+    }
+
+
+def bench_decoding(wav_dir, model_size=None, latency_target=1.0, carry_context=False, stub_rtf=0.05, repeat=3,
+                   sample_rate=16000):
+    """Decode WAV fixtures with fixed parameters and with the adaptive policy; returns a JSON-able report."""
+    from fakes import StubModel, read_wav
+    from transcriber import DecodingPolicy, WhisperTranscriber
+
+    files = sorted(glob.glob(os.path.join(wav_dir, "*.wav")))
+    if not files:
+        raise SystemExit(f"No WAV files found in {wav_dir}")
+    recordings = [read_wav(file_path, sample_rate) for file_path in files]
+
+    if model_size:
+        from model_manager import ModelManager
+        model = ModelManager(device="cpu", compute_type="int8").get(model_size)
+    else:
+        # Beam search and language detection cost roughly what they do on CPU relative to greedy decoding
+        model = StubModel(rtf=stub_rtf, sample_rate=sample_rate, beam_cost=0.15, detect_time=0.05)
+
+    policies = {
+        "fixed": DecodingPolicy(lock_after=0),  # beam_size=5 and language detection on every utterance
+        "adaptive": DecodingPolicy(latency_target=latency_target, carry_context=carry_context),
+    }
+    report = {"files": len(files), "repeat": repeat, "model": model_size or f"stub (rtf={stub_rtf})",
+              "latency_target_s": latency_target}
+    for name, policy in policies.items():
+        transcriber = WhisperTranscriber(sample_rate=sample_rate, policy=policy)
+        transcriber.model = model
+        timings = []
+        for _ in range(repeat):
+            for recording in recordings:
+                start = time.perf_counter()
+                transcriber.transcribe_audio(recording)
+                timings.append(time.perf_counter() - start)
+        report[name] = {
+            "latency_ms": percentiles(timings),
+            "total_s": round(sum(timings), 3),
+            "language": policy.language_for(),
+            "beam_sizes": sorted(policy.rtf),
+        }
+    report["saved_s"] = round(report["fixed"]["total_s"] - report["adaptive"]["total_s"], 3)
+    return report
+
+
+def bench_responsiveness(model_size=None, seconds=10.0, repeat=3, tick=0.01, sample_rate=16000):
+    """Measure how late a UI-style periodic timer fires while utterances decode in-process vs in a worker process."""
+    from fakes import StubModel
+    from model_process import ProcessModel
+
+    if model_size:
+        from model_manager import ModelManager
+        in_process = ModelManager(device="cpu", compute_type="int8").get(model_size)
+        worker = ProcessModel(model_size, device="cpu", compute_type="int8")
+    else:
+        # Decoding spins in Python and holds the GIL, like faster-whisper's tokenizer and segment loop
+        in_process = StubModel(rtf=0.2, sample_rate=sample_rate, cpu_bound=True)
+        worker = ProcessModel(factory="fakes:StubModel", rtf=0.2, sample_rate=sample_rate, cpu_bound=True)
+    audio = (np.random.default_rng(0).standard_normal(int(seconds * sample_rate)) * 0.1).astype(np.float32)
+
+    def timer_lag(model):
+        """Run a `tick` timer on this thread (like Tk's root.after) while another thread decodes."""
+        lags = []
+        decoding = threading.Thread(target=lambda: [list(model.transcribe(audio)[0]) for _ in range(repeat)])
+        decoding.start()
+        while decoding.is_alive():
+            start = time.perf_counter()
+            time.sleep(tick)
+            lags.append(time.perf_counter() - start - tick)
+        return lags
+
+    report = {"model": model_size or "stub (cpu-bound, rtf=0.2)", "utterance_s": seconds, "tick_ms": tick * 1000}
+    report["in_process_lag_ms"] = percentiles(timer_lag(in_process))
+    report["worker_process_lag_ms"] = percentiles(timer_lag(worker))
+    worker.close()
+    return report
+
+
+def bench_segments(model_size=None, seconds=30.0, repeat=3, stub_rtf=0.05, sample_rate=16000):
+    """Time to first text with segment streaming vs waiting for the whole decode of a long utterance."""
+    from fakes import StubModel
+    from transcriber import WhisperTranscriber
+
+    if model_size:
+        from model_manager import ModelManager
+        model = ModelManager(device="cpu", compute_type="int8").get(model_size)
+    else:
+        model = StubModel(text="a sentence of stub speech.", rtf=stub_rtf, sample_rate=sample_rate, segment_seconds=5.0)
+    transcriber = WhisperTranscriber(sample_rate=sample_rate, trim_silence=False, parallel_workers=1)
+    transcriber.model = model
+    audio = (np.random.default_rng(0).standard_normal(int(seconds * sample_rate)) * 0.1).astype(np.float32)
+
+    first, total, segments = [], [], []
+    for _ in range(repeat):
+        arrivals = []
+        start = time.perf_counter()
+        transcriber.transcribe_audio(audio, on_segment=lambda index, text: arrivals.append(time.perf_counter()))
+        total.append(time.perf_counter() - start)
+        first.append((arrivals[0] if arrivals else time.perf_counter()) - start)
+        segments.append(len(arrivals))
+    return {
+        "model": model_size or f"stub (rtf={stub_rtf}, 5s segments)",
+        "utterance_s": seconds,
+        "segments": max(segments),
+        "streamed_first_text_ms": percentiles(first),
+        "whole_decode_first_text_ms": percentiles(total),
+    }
+
+
+def bench_imports(repeat=5):
+    """Measure the cold import time of the client modules in fresh interpreters and check the budget."""
+    script = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {', '.join(STARTUP_MODULES)}\n"
+        "elapsed = (time.perf_counter() - start) * 1000\n"
+        f"loaded = [m for m in {DEFERRED_MODULES!r} if m in sys.modules]\n"
+        "print(elapsed, ','.join(loaded))\n"
+    )
+    here = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    loaded = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", script], cwd=here, capture_output=True, text=True, check=True)
+        elapsed, modules = output.stdout.split(" ", 1)
+        timings.append(float(elapsed))
+        loaded = [module for module in modules.strip().split(",") if module]
+    report = {
+        "import_ms": {"min": round(min(timings), 1), "median": round(float(np.median(timings)), 1)},
+        "budget_ms": IMPORT_BUDGET_MS,
+        "heavy_modules_loaded": loaded,
+        "within_budget": min(timings) <= IMPORT_BUDGET_MS and not loaded,
+    }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="STT client benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    handoff = commands.add_parser("handoff", help="Temp WAV round-trip vs in-memory handoff")
+    handoff.add_argument("--seconds", type=float, default=10.0, help="Utterance length in seconds")
+    handoff.add_argument("--repeat", type=int, default=20, help="Number of runs per measurement")
+
+    replay = commands.add_parser("pipeline", help="Replay WAV fixtures through the full client pipeline")
+    replay.add_argument("wav_dir", help="Directory of WAV fixtures (optional .txt sidecars set the stub text)")
+    replay.add_argument("--model", default=None, help="Real Whisper model to use on CPU (e.g. tiny); stub if omitted")
+    replay.add_argument("--speed", type=float, default=0.0, help="Replay speed relative to real time (0 = unpaced)")
+    replay.add_argument("--stub-rtf", type=float, default=0.05, help="Real-time factor of the stub model")
+    replay.add_argument("--port", type=int, default=5055, help="Port for the local socket.io server")
+    replay.add_argument("--max-queue", type=int, default=2, help="Pipeline queue size between capture and decode")
+    replay.add_argument("--policy", default="block", choices=("block", "drop_oldest", "merge"),
+                        help="Pipeline backpressure policy when the queue is full")
+    replay.add_argument("--output", default=None, help="Write the JSON report here instead of stdout")
+
+    decoding = commands.add_parser("decoding", help="Fixed decode parameters vs the adaptive decoding policy")
+    decoding.add_argument("wav_dir", help="Directory of WAV fixtures")
+    decoding.add_argument("--model", default=None, help="Real Whisper model to use on CPU (e.g. tiny); stub if omitted")
+    decoding.add_argument("--latency-target", type=float, default=1.0, help="Decode time budget per utterance")
+    decoding.add_argument("--carry-context", action="store_true", help="Prompt with the previous transcript")
+    decoding.add_argument("--stub-rtf", type=float, default=0.05, help="Greedy real-time factor of the stub model")
+    decoding.add_argument("--repeat", type=int, default=3, help="Passes over the fixtures")
+
+    responsiveness = commands.add_parser("responsiveness", help="UI timer lag during in-process vs worker decodes")
+    responsiveness.add_argument("--model", default=None, help="Real Whisper model to use on CPU (e.g. tiny); stub if omitted")
+    responsiveness.add_argument("--seconds", type=float, default=10.0, help="Utterance length in seconds")
+    responsiveness.add_argument("--repeat", type=int, default=3, help="Decodes per measurement")
+
+    segments = commands.add_parser("segments", help="Time to first text with segment streaming vs whole decodes")
+    segments.add_argument("--model", default=None, help="Real Whisper model to use on CPU (e.g. tiny); stub if omitted")
+    segments.add_argument("--seconds", type=float, default=30.0, help="Utterance length in seconds")
+    segments.add_argument("--repeat", type=int, default=3, help="Decodes per measurement")
+    segments.add_argument("--stub-rtf", type=float, default=0.05, help="Real-time factor of the stub model")
+
+    imports = commands.add_parser("imports", help="Check startup import time against the budget")
+    imports.add_argument("--repeat", type=int, default=5, help="Number of fresh interpreters to time")
+
+    args = parser.parse_args()
+    if args.command == "handoff":
+        bench_handoff(args.seconds, repeat=args.repeat)
+    elif args.command == "decoding":
+        print(json.dumps(bench_decoding(args.wav_dir, args.model, args.latency_target, args.carry_context,
+                                        args.stub_rtf, args.repeat), indent=2))
+    elif args.command == "responsiveness":
+        print(json.dumps(bench_responsiveness(args.model, args.seconds, args.repeat), indent=2))
+    elif args.command == "segments":
+        print(json.dumps(bench_segments(args.model, args.seconds, args.repeat, args.stub_rtf), indent=2))
+    elif args.command == "imports":
+        report = bench_imports(args.repeat)
+        print(json.dumps(report, indent=2))
+        sys.exit(0 if report["within_budget"] else 1)
+    else:
+        report = json.dumps(bench_pipeline(args.wav_dir, args.model, args.speed, args.stub_rtf, args.port,
+                                                 max_queue=args.max_queue, policy=args.policy), indent=2)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(report)
+        else:
+            print(report)
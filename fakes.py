@@ -0,0 +1,147 @@
+# fakes.py
+import threading
+import time
+from types import SimpleNamespace
+import numpy as np
+
+
+def read_wav(file_path, sample_rate=16000):
+    """Read a WAV file as float32 mono, resampling naively if needed."""
+    from scipy.io.wavfile import read
+
+    rate, samples = read(file_path)
+    if samples.dtype == np.int16:
+        samples = samples.astype(np.float32) / 32768.0
+    elif samples.dtype == np.int32:
+        samples = samples.astype(np.float32) / 2147483648.0
+    samples = samples.astype(np.float32, copy=False)
+    if samples.ndim > 1:
+        samples = samples[:, 0]
+    if rate != sample_rate:
+        positions = np.arange(0, len(samples), rate / sample_rate)
+        samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+    return np.ascontiguousarray(samples)
+
+
+class FakeInputStream:
+    """Stands in for sounddevice.InputStream; audio is pushed in with feed()."""
+
+    instances = []  # Every stream created, so callers can reach the one AudioCapture opened
+
+    def __init__(self, samplerate, blocksize, callback, channels=1, **kwargs):
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+        self.callback = callback
+        self.channels = channels
+        self.active = False
+        FakeInputStream.instances.append(self)
+
+    def start(self):
+        self.active = True
+
+    def stop(self):
+        self.active = False
+
+    def close(self):
+        pass
+
+    def feed(self, samples, speed=1.0):
+        """Deliver samples block by block, paced at `speed` times real time (0 means as fast as possible)."""
+        block_time = self.blocksize / self.samplerate
+        start = time.perf_counter()
+        for i, offset in enumerate(range(0, len(samples), self.blocksize)):
+            if not self.active:
+                break
+            block = samples[offset:offset + self.blocksize]
+            self.callback(block.reshape(-1, self.channels), len(block), None, None)
+            if speed:
+                delay = start + (i + 1) * block_time / speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+
+class FakeKey:
+    """Key object with the attributes HotkeyListener looks at."""
+
+    def __init__(self, name):
+        self.name = name
+        self.char = name if len(name) == 1 else None
+
+
+class FakeKeyListener:
+    """Stands in for pynput.keyboard.Listener; key events are injected with press()/release()."""
+
+    def __init__(self, on_press, on_release):
+        self.on_press = on_press
+        self.on_release = on_release
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def press(self, key):
+        self.on_press(FakeKey(key) if isinstance(key, str) else key)
+
+    def release(self, key):
+        self.on_release(FakeKey(key) if isinstance(key, str) else key)
+
+
+class StubModel:
+    """Deterministic stand-in for WhisperModel that 'decodes' at a fixed real-time factor."""
+
+    def __init__(self, text="stub transcription", rtf=0.05, sample_rate=16000, beam_cost=0.0, detect_time=0.0,
+                 cpu_bound=False, segment_seconds=None, num_workers=1, avg_logprob=-0.1, no_speech_prob=0.01):
+        self.text = text
+        self.rtf = rtf  # At beam_size=1
+        self.sample_rate = sample_rate
+        self.beam_cost = beam_cost  # Extra fraction of decode time per additional beam
+        self.detect_time = detect_time  # Cost of the language detection pass when no language is given
+        self.cpu_bound = cpu_bound  # Spin in Python holding the GIL, like faster-whisper's Python-side work
+        self.lock = threading.Semaphore(num_workers)  # Like CTranslate2, at most num_workers decodes overlap
+        # When set, the text is repeated once per this many seconds of audio and each copy is a segment that,
+        # like faster-whisper's, is only decoded when the caller iterates to it
+        self.segment_seconds = segment_seconds
+        self.avg_logprob = avg_logprob  # Confidence fields set on every segment
+        self.no_speech_prob = no_speech_prob
+
+    def spend(self, cost):
+        with self.lock:
+            if self.cpu_bound:
+                deadline = time.perf_counter() + cost
+                while time.perf_counter() < deadline:
+                    sum(range(1000))
+            else:
+                time.sleep(cost)
+
+    def transcribe(self, audio, **kwargs):
+        duration = len(audio) / self.sample_rate
+        cost = duration * self.rtf * (1 + self.beam_cost * (kwargs.get("beam_size", 5) - 1))
+        if self.segment_seconds:
+            if kwargs.get("language") is None:
+                self.spend(self.detect_time)  # Detection runs up front, before the first segment
+            info = SimpleNamespace(language=kwargs.get("language") or "en", language_probability=1.0, duration=duration)
+            return self.lazy_segments(duration, cost), info
+        if kwargs.get("language") is None:
+            cost += self.detect_time
+        self.spend(cost)
+        words = self.text.split()
+        step = duration / max(1, len(words))
+        segment = SimpleNamespace(
+            id=0, start=0.0, end=duration, text=" " + self.text,
+            words=[SimpleNamespace(word=" " + word, start=i * step, end=(i + 1) * step, probability=1.0)
+                   for i, word in enumerate(words)],
+            avg_logprob=self.avg_logprob, no_speech_prob=self.no_speech_prob, compression_ratio=1.0,
+        )
+        info = SimpleNamespace(language=kwargs.get("language") or "en", language_probability=1.0, duration=duration)
+        return iter([segment]), info
+
+    def lazy_segments(self, duration, cost):
+        count = max(1, int(np.ceil(duration / self.segment_seconds)))
+        for i in range(count):
+            self.spend(cost / count)
+            start = i * self.segment_seconds
+            yield SimpleNamespace(id=i, start=start, end=min(duration, start + self.segment_seconds),
+                                  text=" " + self.text, words=None, avg_logprob=self.avg_logprob,
+                                  no_speech_prob=self.no_speech_prob, compression_ratio=1.0)
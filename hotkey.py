@@ -0,0 +1,130 @@
+# hotkey.py
+import queue
+import threading
+import time
+
+# Threshold for key press time (in seconds)
+KEY_PRESS_THRESHOLD = 0.5  # Ignore key presses shorter than 0.5 seconds
+
+
+class HotkeyListener:
+    def __init__(self, keybind="space", threshold=KEY_PRESS_THRESHOLD, on_press=None, on_release=None,
+                 listener_factory=None):
+        self.keybind = keybind
+        self.threshold = threshold
+        self.on_press = on_press  # Called on the listener thread as soon as the key goes down
+        self.on_release = on_release  # Called on the listener thread with (duration, accepted); may return a span
+        self.listener_factory = listener_factory  # Swappable for tests; pynput if None
+        self.listener = None
+        self.events = queue.Queue()
+        self.pressed = threading.Event()
+        self.press_start_time = None  # time.perf_counter at the press, for latency tracing
+        self.clock = time.perf_counter  # Measures the hold duration; replays drive it from the audio position
+        self.press_clock = None
+        self.continued = False  # The held press was split; its remainder is accepted whatever its length
+        self.on_key = None  # Optional tap called with ("press" | "release", key) for keybind events
+        self.on_split = None  # Closes the held utterance and opens its continuation; returns the closed span
+        self.lock = threading.Lock()  # Keeps a split and the real release in order
+
+    def start(self):
+        """Start the persistent keyboard listener."""
+        if self.listener is None:
+            # Drop any stale stop event left over from a previous session
+            while not self.events.empty():
+                self.events.get_nowait()
+            if self.listener_factory is None:
+                from pynput import keyboard  # Deferred: needs a display on Linux
+                self.listener_factory = keyboard.Listener
+            self.listener = self.listener_factory(on_press=self.handle_press, on_release=self.handle_release)
+            self.listener.start()
+            print("Hotkey listener started.")
+
+    def stop(self):
+        """Stop the listener and wake up anyone waiting on it."""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+            print("Hotkey listener stopped.")
+        self.events.put(("stop", None, False, None, None))
+
+    def set_keybind(self, keybind):
+        """Set the key used for push-to-talk."""
+        self.keybind = keybind
+
+    def matches(self, key):
+        """Check whether a pynput key (or a plain string) is the configured keybind."""
+        if isinstance(key, str):
+            return key == self.keybind
+        char = getattr(key, "char", None)
+        if char is not None:
+            return char == self.keybind
+        name = getattr(key, "name", None)
+        return self.keybind in (name, str(key))
+
+    def handle_press(self, key):
+        """Handle key press events, ignoring OS key repeat while held."""
+        if not self.matches(key):
+            return
+        if self.on_key:
+            self.on_key("press", key)
+        with self.lock:
+            if self.pressed.is_set():
+                return
+            self.press_start_time = time.perf_counter()
+            self.press_clock = self.clock()
+            self.continued = False
+            self.pressed.set()
+            if self.on_press:
+                self.on_press()
+            self.events.put(("press", 0.0, True, None, self.press_start_time))
+        print("Recording started")
+
+    def handle_release(self, key):
+        """Handle key release events and apply the debounce threshold."""
+        if not self.matches(key):
+            return
+        if self.on_key:
+            self.on_key("release", key)
+        if not self.pressed.is_set():
+            return
+        with self.lock:
+            duration = self.clock() - self.press_clock
+            # The tail of a split utterance is never a short press, however little of it is left
+            accepted = duration >= self.threshold or self.continued
+            self.pressed.clear()
+            if not accepted:
+                print(f"Key {self.keybind} pressed too quickly ({duration:.2f}s). Ignoring.")
+            span = self.on_release(duration, accepted) if self.on_release else None
+            self.events.put(("release", duration, accepted, span, self.press_start_time))
+
+    def split(self):
+        """End the held utterance here, as if the key had been released and pressed again at once.
+
+        Used when an utterance reaches the capture length cap while the key is still down.
+        """
+        with self.lock:
+            if not self.pressed.is_set() or self.on_split is None:
+                return
+            span = self.on_split()
+            self.events.put(("release", self.clock() - self.press_clock, True, span, self.press_start_time))
+            self.press_start_time = time.perf_counter()
+            self.press_clock = self.clock()
+            self.continued = True
+        print("Utterance reached the length limit; continuing in a new one.")
+
+    def wait_for_release(self, timeout=None):
+        """Block until the key is released; returns (duration, accepted, span, press time) or None if stopped
+        or timed out.
+
+        Releases queue up, each with the span on_release returned for it and the perf_counter time of
+        its press, so none is lost or mixed up with a later press while the caller is busy.
+        """
+        while True:
+            try:
+                kind, duration, accepted, span, pressed_at = self.events.get(timeout=timeout)
+            except queue.Empty:
+                return None
+            if kind == "stop":
+                return None
+            if kind == "release":
+                return duration, accepted, span, pressed_at
@@ -0,0 +1,88 @@
+# local_server.py
+import queue
+import threading
+import time
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import make_server, WSGIServer, WSGIRequestHandler
+import socketio
+from websocket_client import BATCH_EVENT
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalServer:
+    """Minimal socket.io stand-in for the real server, used by benchmarks and replay tools."""
+
+    def __init__(self, host="127.0.0.1", port=5055, echo=False, record=True):
+        self.host = host
+        self.port = port
+        self.url = f"http://{host}:{port}"
+        # wsgiref can't hand over raw sockets, so clients stay on long-polling
+        self.sio = socketio.Server(async_mode="threading", transports=["polling"])
+        self.received = queue.Queue()  # (receive time, event, data) for every client message, if recording
+        self.server = None
+        self.echo = echo  # Broadcast every stt_transcription back as stt_transcription_update, like the real server
+        self.clients = set()
+        self.sio.on("connect", self.on_connect)
+        self.sio.on("disconnect", self.on_disconnect)
+        if record:
+            self.sio.on("*", self.on_event)
+
+    def on_connect(self, sid, environ, auth=None):
+        self.clients.add(sid)
+
+    def on_disconnect(self, sid, *args):
+        self.clients.discard(sid)
+
+    def on_event(self, event, sid, data=None):
+        """Record any event sent by a client; a batch is recorded as the transcriptions it carries."""
+        received_at = time.perf_counter()
+        if event == BATCH_EVENT and isinstance(data, list):
+            for item in data:
+                self.record_transcription(received_at, item)
+            return
+        self.received.put((received_at, event, data))
+        if self.echo and event == "stt_transcription":
+            self.sio.emit("stt_transcription_update", data)
+
+    def record_transcription(self, received_at, data):
+        self.received.put((received_at, "stt_transcription", data))
+        if self.echo:
+            self.sio.emit("stt_transcription_update", data)
+
+    def start(self):
+        """Start serving in a background thread."""
+        self.server = make_server(self.host, self.port, socketio.WSGIApp(self.sio), ThreadingWSGIServer, QuietHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        print(f"Local server listening on {self.url}")
+
+    def stop(self):
+        """Stop serving; connected clients will see the link drop."""
+        for sid in list(self.clients):
+            self.sio.disconnect(sid)
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            print("Local server stopped.")
+
+    def wait_for(self, event, timeout=10.0):
+        """Wait for the next message of the given event; returns (receive time, data) or None."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                received_at, name, data = self.received.get(timeout=remaining)
+            except queue.Empty:
+                return None
+            if name == event:
+                return received_at, data
@@ -1,17 +1,16 @@
 # main.py
 import tkinter as tk
 from tkinter import simpledialog
-from config import load_config, save_config
-from transcriber import WhisperTranscriber
-from websocket_client import WebSocketClient
+from config import CONFIG_FILE, load_config, save_config
+from sttclient import build_websocket_client, build_transcriber, build_tracer, build_pipeline
 from ui import STTClientUI
 import threading
-import sounddevice as sd
 
 class STTClientApp:
-    def __init__(self, root):
+    def __init__(self, root, config=None, config_path=CONFIG_FILE):
         self.root = root
-        self.config = load_config()
+        self.config_path = config_path
+        self.config = config if config is not None else load_config(config_path)
 
         # Initialize UI
         self.ui = STTClientUI(
@@ -24,11 +23,19 @@ class STTClientApp:
         )
 
         # Initialize WebSocket client with the UI's log method
-        self.websocket_client = WebSocketClient(self.on_message, self.ui.log)
+        self.websocket_client = build_websocket_client(self.config, self.on_message, self.ui.log)
 
-        # Initialize Whisper Transcriber
-        self.transcriber = WhisperTranscriber()
-        self.transcriber.set_keybind(self.config.get("keybind", "space"))
+        # Initialize Whisper Transcriber (model loading, capture and hotkey imports happen on first use)
+        self.transcriber = build_transcriber(self.config, self.ui.log, on_partial=self.send_partial,
+                                             websocket_client=self.websocket_client)
+
+        self.pipeline = None
+        self.tracer = build_tracer(self.config, self.ui.log)
+        self.websocket_client.latency_callback = self.tracer.observe
+
+        # Load the model in the background so the first toggle doesn't freeze the UI
+        if self.config.get("preload_model", True):
+            self.transcriber.preload_model()
 
         # Initial connection attempt
         self.try_connect_again()
@@ -40,6 +47,10 @@ class STTClientApp:
             self.websocket_client.send_message(message)
             self.ui.text_input.delete(0, tk.END)
 
+    def send_partial(self, utterance_id, text):
+        """Forward a partial transcription while the key is still held."""
+        self.websocket_client.send_partial(utterance_id, text)
+
     def on_message(self, data):
         """Handle incoming messages."""
         # print()
@@ -56,7 +67,7 @@ class STTClientApp:
             self.config["keybind"] = keybind
             self.transcriber.set_keybind(keybind)
             self.ui.keybind_label.config(text=f"Current Keybind: {keybind}")
-            save_config(self.config)
+            save_config(self.config, self.config_path)
 
     def toggle_stt(self):
         """Start/Stop STT and load/unload the model."""
@@ -64,12 +75,15 @@ class STTClientApp:
             # Stop listening
             self.ui.listening = False
             self.ui.stt_button.config(text="Start STT")
+            if self.pipeline:
+                self.pipeline.stop()
+                self.pipeline = None
+            self.transcriber.stop_listening()
             self.transcriber.unload_model()
         else:
             # Start listening
             self.ui.listening = True
             self.ui.stt_button.config(text="Stop STT")
-            self.transcriber.load_model()
 
             # Deselect the text input field
             self.root.focus()
@@ -80,21 +94,25 @@ class STTClientApp:
     def start_stt(self):
         """Start microphone stream and process audio in real-time."""
         self.ui.log("Starting STT...")
+        self.transcriber.load_model()  # Waits on the worker thread, not the Tk thread
+        if not self.ui.listening:
+            # STT was turned off again while the model was loading
+            self.transcriber.unload_model()
+            return
         self.ui.log("Listening...")
 
-        # Get selected mic index
-        mic_index = int(self.ui.selected_mic.get().split(":")[0])
-        self.config["mic_index"] = mic_index
-        save_config(self.config)
-        sd.default.device = mic_index
-
-        # Continuous recording as long as the listening flag is True
-        while self.ui.listening:
-            recording = self.transcriber.record_audio()
-            transcription = self.transcriber.save_temp_audio(recording)
-            if transcription.strip():
-                # self.ui.log(f"Transcription: {transcription}")
-                self.websocket_client.send_message(transcription)
+        # Get selected mic index; configured input sources are opened by the pipeline instead
+        if not self.transcriber.sources:
+            mic_index = int(self.ui.selected_mic.get().split(":")[0])
+            self.config["mic_index"] = mic_index
+            save_config(self.config, self.config_path)
+            self.transcriber.capture.start(device=mic_index)
+
+        # Capture, transcription and sending run as separate stages, so the next
+        # utterance can be recorded while the previous one is being decoded
+        self.pipeline = build_pipeline(self.config, self.transcriber, self.websocket_client, self.ui.log,
+                                       self.tracer)
+        self.pipeline.start()
 
 if __name__ == "__main__":
     root = tk.Tk()
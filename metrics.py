@@ -0,0 +1,184 @@
+# metrics.py
+import collections
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import RotatingFileHandler
+import numpy as np
+
+# Durations derived from each span: name -> (start mark, end mark)
+STAGES = {
+    "key_to_capture_end": ("key_press", "capture_end"),
+    "capture_to_decode_start": ("capture_end", "decode_start"),
+    "decode": ("decode_start", "decode_end"),
+    "first_segment": ("decode_start", "first_segment"),  # Segment streaming: decode time until text went out
+    "postprocess": ("postprocess_start", "postprocess_end"),
+    "emit": ("emit_start", "emit_end"),
+}
+QUANTILES = (0.5, 0.95, 0.99)
+ROLLING_WINDOW = 200  # Spans kept for rolling percentiles
+
+
+class Span:
+    """Timestamps (time.perf_counter) for one utterance as it moves through the pipeline."""
+
+    def __init__(self, utterance_id):
+        self.utterance_id = utterance_id
+        self.marks = {}
+        self.values = {}
+
+    def mark(self, name, at=None):
+        self.marks[name] = time.perf_counter() if at is None else at
+
+    def set(self, name, value):
+        self.values[name] = value
+
+    def durations(self):
+        """Return the stage durations (in seconds) for which both marks were recorded."""
+        result = {}
+        for stage, (start, end) in STAGES.items():
+            if start in self.marks and end in self.marks:
+                result[stage] = self.marks[end] - self.marks[start]
+        if "decode" in result and self.values.get("audio_duration"):
+            result["rtf"] = result["decode"] / self.values["audio_duration"]
+        return result
+
+
+class NullSpan:
+    """Stand-in used when tracing is off, so instrumented code costs a no-op call."""
+
+    utterance_id = None
+
+    def mark(self, name, at=None):
+        pass
+
+    def set(self, name, value):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class Tracer:
+    """Collects one span per utterance and exports them as JSONL, Prometheus text and log summaries."""
+
+    def __init__(self, enabled=False, jsonl_path=None, max_bytes=5_000_000, backups=3, prometheus_port=None,
+                 log=None, summary_every=10):
+        self.enabled = enabled
+        self.log = log
+        self.summary_every = summary_every
+        self.lock = threading.Lock()
+        self.rolling = collections.defaultdict(lambda: collections.deque(maxlen=ROLLING_WINDOW))
+        self.totals = collections.defaultdict(float)  # Sum of each stage over all spans
+        self.counts = collections.defaultdict(int)  # Number of spans that recorded each stage
+        self.count = 0
+        self.saved_decode = 0.0  # Estimated decode time saved by silence trimming and no-speech skips
+
+        self.span_log = None
+        if enabled and jsonl_path:
+            self.span_log = logging.getLogger("stt.spans")
+            self.span_log.propagate = False
+            self.span_log.setLevel(logging.INFO)
+            handler = RotatingFileHandler(jsonl_path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.span_log.addHandler(handler)
+
+        self.http_server = None
+        if enabled and prometheus_port:
+            self.start_http_server(prometheus_port)
+
+    def start_span(self, utterance_id):
+        return Span(utterance_id) if self.enabled else NULL_SPAN
+
+    def finish(self, span):
+        """Record a completed span."""
+        if span is NULL_SPAN:
+            return
+        durations = span.durations()
+        with self.lock:
+            self.count += 1
+            for stage, value in durations.items():
+                self.rolling[stage].append(value)
+                self.totals[stage] += value
+                self.counts[stage] += 1
+            self.saved_decode += span.values.get("saved_decode_seconds", 0.0)
+            count = self.count
+
+        if self.span_log:
+            record = {"utterance_id": span.utterance_id, "time": time.time()}
+            record.update({stage: round(value, 6) for stage, value in durations.items()})
+            record.update(span.values)
+            self.span_log.info(json.dumps(record))
+
+        if self.log and self.summary_every and count % self.summary_every == 0:
+            self.log(self.summary())
+
+    def observe(self, metric, seconds):
+        """Record a latency measured outside the span (e.g. ack round-trip); reported like a stage."""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.rolling[metric].append(seconds)
+            self.totals[metric] += seconds
+            self.counts[metric] += 1
+
+    def summary(self):
+        """One-line rolling p50/p95 summary for the UI log."""
+        with self.lock:
+            parts = [
+                f"{stage} p50={np.percentile(values, 50) * 1000:.0f}ms p95={np.percentile(values, 95) * 1000:.0f}ms"
+                for stage, values in self.rolling.items() if stage != "rtf" and values
+            ]
+            if self.rolling["rtf"]:
+                parts.append(f"rtf p50={np.percentile(self.rolling['rtf'], 50):.2f}")
+            count = self.count
+            if self.saved_decode:
+                parts.append(f"decode saved by trimming {self.saved_decode:.1f}s total")
+        return f"Last {min(count, ROLLING_WINDOW)} utterances: " + ", ".join(parts)
+
+    def prometheus_text(self):
+        """Render the metrics in the Prometheus text exposition format."""
+        lines = [
+            "# TYPE stt_utterances_total counter",
+            f"stt_utterances_total {self.count}",
+            "# TYPE stt_stage_seconds summary",
+        ]
+        with self.lock:
+            for stage, values in self.rolling.items():
+                if stage == "rtf" or not values:
+                    continue
+                for quantile in QUANTILES:
+                    lines.append(f'stt_stage_seconds{{stage="{stage}",quantile="{quantile}"}} '
+                                 f'{np.percentile(values, quantile * 100):.6f}')
+                lines.append(f'stt_stage_seconds_sum{{stage="{stage}"}} {self.totals[stage]:.6f}')
+                lines.append(f'stt_stage_seconds_count{{stage="{stage}"}} {self.counts[stage]}')
+            lines.append("# TYPE stt_saved_decode_seconds_total counter")
+            lines.append(f"stt_saved_decode_seconds_total {self.saved_decode:.4f}")
+            if self.rolling["rtf"]:
+                lines.append("# TYPE stt_real_time_factor gauge")
+                lines.append(f"stt_real_time_factor {np.percentile(self.rolling['rtf'], 50):.4f}")
+        return "\n".join(lines) + "\n"
+
+    def start_http_server(self, port):
+        """Serve /metrics on localhost in a background thread."""
+        tracer = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tracer.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.http_server = ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+        threading.Thread(target=self.http_server.serve_forever, daemon=True).start()
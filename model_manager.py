@@ -0,0 +1,131 @@
+# model_manager.py
+import threading
+import time
+
+# Models that haven't been used for this long are evicted (in seconds)
+DEFAULT_IDLE_TIMEOUT = 600
+
+
+def detect_device():
+    """Pick the best available device and compute type."""
+    try:
+        import ctranslate2
+        if ctranslate2.get_cuda_device_count() > 0:
+            return "cuda", "float16"
+    except Exception:
+        pass
+    return "cpu", "int8"
+
+
+class ModelManager:
+    """Loads Whisper models in the background and keeps them cached across STT toggles."""
+
+    def __init__(self, device="auto", compute_type="auto", cpu_threads=0, num_workers=1,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT, log=print, model_factory=None):
+        self.device = device
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads  # 0 lets CTranslate2 choose
+        self.num_workers = num_workers
+        self.idle_timeout = idle_timeout
+        self.log = log
+        self.model_factory = model_factory  # WhisperModel if None
+        self.models = {}  # model_size -> loaded model
+        self.last_used = {}  # model_size -> time the model was last released
+        self.in_use = {}  # model_size -> number of active users
+        self.loading = {}  # model_size -> Event set when the load finishes
+        self.lock = threading.Lock()
+        self.evictor = None
+
+    def resolve_device(self):
+        """Return the (device, compute_type) pair to load with."""
+        device, compute_type = self.device, self.compute_type
+        if device == "auto":
+            device, detected_type = detect_device()
+            if compute_type == "auto":
+                compute_type = detected_type
+        elif compute_type == "auto":
+            compute_type = "float16" if device == "cuda" else "int8"
+        return device, compute_type
+
+    def load(self, model_size):
+        """Load a model, falling back to CPU int8 if the preferred device fails."""
+        if self.model_factory is None:
+            from faster_whisper import WhisperModel  # Deferred: importing it alone takes seconds
+            self.model_factory = WhisperModel
+        device, compute_type = self.resolve_device()
+        start = time.perf_counter()
+        try:
+            model = self.model_factory(model_size, device=device, compute_type=compute_type,
+                                       cpu_threads=self.cpu_threads, num_workers=self.num_workers)
+        except Exception as e:
+            if device == "cpu":
+                raise
+            self.log(f"Loading {model_size} on {device} failed ({e}), falling back to CPU int8.")
+            device, compute_type = "cpu", "int8"
+            model = self.model_factory(model_size, device=device, compute_type=compute_type,
+                                       cpu_threads=self.cpu_threads, num_workers=self.num_workers)
+        self.log(f"Whisper model '{model_size}' loaded on {device} ({compute_type}) in {time.perf_counter() - start:.1f}s.")
+        return model
+
+    def preload(self, model_size):
+        """Start loading a model in the background; returns immediately."""
+        threading.Thread(target=self.get, args=(model_size, False), daemon=True).start()
+
+    def get(self, model_size, acquire=True):
+        """Return a loaded model, loading it (or waiting for a background load) if needed."""
+        with self.lock:
+            model = self.models.get(model_size)
+            event = self.loading.get(model_size)
+            owner = model is None and event is None
+            if owner:
+                event = self.loading[model_size] = threading.Event()
+        if owner:
+            try:
+                model = self.load(model_size)
+                with self.lock:
+                    self.models[model_size] = model
+                    self.last_used[model_size] = time.monotonic()
+            finally:
+                with self.lock:
+                    del self.loading[model_size]
+                event.set()
+        elif model is None:
+            event.wait()
+            with self.lock:
+                model = self.models.get(model_size)
+            if model is None:
+                raise RuntimeError(f"Loading Whisper model '{model_size}' failed.")
+
+        if acquire:
+            with self.lock:
+                self.in_use[model_size] = self.in_use.get(model_size, 0) + 1
+        self.start_evictor()
+        return model
+
+    def release(self, model_size):
+        """Mark a model as no longer used; it stays cached until the idle timeout passes."""
+        with self.lock:
+            self.in_use[model_size] = max(0, self.in_use.get(model_size, 0) - 1)
+            self.last_used[model_size] = time.monotonic()
+
+    def evict_idle(self):
+        """Drop cached models that have been idle for longer than the timeout."""
+        now = time.monotonic()
+        with self.lock:
+            for model_size in list(self.models):
+                if self.in_use.get(model_size, 0) == 0 and now - self.last_used.get(model_size, now) > self.idle_timeout:
+                    model = self.models.pop(model_size)
+                    if hasattr(model, "close"):
+                        model.close()  # Worker-process models hold a process and shared memory
+                    self.log(f"Whisper model '{model_size}' evicted after being idle.")
+
+    def start_evictor(self):
+        """Start the background thread that evicts idle models."""
+        if self.idle_timeout and self.evictor is None:
+            self.evictor = threading.Thread(target=self.evict_loop, daemon=True)
+            self.evictor.start()
+
+    def evict_loop(self):
+        while True:
+            time.sleep(min(60, self.idle_timeout))
+            self.evict_idle()
@@ -0,0 +1,273 @@
+# model_process.py
+import importlib
+import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+import numpy as np
+
+# Worker process supervision (in seconds)
+STARTUP_TIMEOUT = 300  # Loading a large model from disk can take minutes
+HEALTH_INTERVAL = 5.0  # How often an idle worker is pinged
+HEALTH_TIMEOUT = 5.0  # A ping not answered within this is treated as a hang
+MIN_DECODE_TIMEOUT = 60.0  # A decode taking longer than this, or 10x real time, is treated as a hang
+MAX_RESTARTS = 5  # Consecutive failed restarts before giving up
+
+DEFAULT_FACTORY = "faster_whisper:WhisperModel"
+
+
+def load_factory(spec):
+    """Resolve a "module:attribute" string to the callable it names."""
+    module_name, attribute = spec.split(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def to_plain(segment):
+    """Copy the fields the client uses off a faster-whisper segment, so it can be pickled cheaply."""
+    return {
+        "start": segment.start,
+        "end": segment.end,
+        "text": segment.text,
+        "avg_logprob": getattr(segment, "avg_logprob", 0.0),
+        "no_speech_prob": getattr(segment, "no_speech_prob", 0.0),
+        "words": [(word.word, word.start, word.end, word.probability) for word in segment.words or []] or None,
+    }
+
+
+def from_plain(segment):
+    """Rebuild a segment object with the attributes faster-whisper segments have."""
+    words = segment.pop("words")
+    if words is not None:
+        words = [SimpleNamespace(word=word, start=start, end=end, probability=probability)
+                 for word, start, end, probability in words]
+    return SimpleNamespace(words=words, **segment)
+
+
+def serve(conn, model):
+    """Serve decode requests from one pipe until told to stop; returns when the pipe closes."""
+    block = None
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break  # Parent went away
+        command = request[0]
+        if command == "stop":
+            break
+        if command == "ping":
+            conn.send(("pong", None))
+            continue
+
+        _, name, length, options = request
+        try:
+            if block is None or block.name != name:
+                if block is not None:
+                    block.close()
+                # Spawned workers share the parent's resource tracker, so the parent's unlink covers both
+                block = shared_memory.SharedMemory(name=name)
+            audio = np.ndarray((length,), dtype=np.float32, buffer=block.buf)
+            segments, info = model.transcribe(audio, **options)
+            segments = [to_plain(segment) for segment in segments]  # Decoding happens while iterating
+            del audio
+            conn.send(("result", (segments, {
+                "language": info.language,
+                "language_probability": info.language_probability,
+                "duration": info.duration,
+            })))
+        except Exception as e:
+            conn.send(("error", repr(e)))
+    if block is not None:
+        block.close()
+
+
+def worker_main(conns, factory, args, kwargs):
+    """Child process: load the model once, then serve each pipe from its own thread.
+
+    The model is shared by the threads, as faster-whisper's num_workers expects; the process exits
+    when the first pipe is told to stop or closes.
+    """
+    try:
+        model = load_factory(factory)(*args, **kwargs)
+    except Exception as e:
+        conns[0].send(("error", repr(e)))
+        return
+    conns[0].send(("ready", None))
+    for conn in conns[1:]:
+        threading.Thread(target=serve, args=(conn, model), daemon=True).start()
+    serve(conns[0], model)
+
+
+class ProcessModel:
+    """Drop-in for WhisperModel that decodes in a child process, away from the Tk, hotkey and socket threads.
+
+    Audio is handed over through reused shared-memory blocks instead of being pickled; only the
+    options and the resulting segments cross the pipes. There is one pipe (and block) per
+    `num_workers`, so that many decodes run at once on the one model. A crashed or hung worker is restarted.
+    """
+
+    def __init__(self, *args, factory=DEFAULT_FACTORY, log=print, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        self.factory = factory  # "module:attribute" importable in the child, called with args/kwargs
+        self.log = log
+        self.context = multiprocessing.get_context("spawn")  # Never fork a process with Tk and audio threads
+        self.channels = max(1, kwargs.get("num_workers", 1))
+        self.lock = threading.Lock()  # Guards starting, restarting and stopping the worker
+        self.idle = queue.Queue()  # Channels (pipe and block index) not in use by a request
+        for index in range(self.channels):
+            self.idle.put(index)
+        self.process = None
+        self.conns = []
+        self.blocks = [None] * self.channels
+        self.generation = 0  # Bumped on every start, so concurrent failures restart the worker only once
+        self.restarts = 0
+        self.closed = False
+        self.start()
+        threading.Thread(target=self.health_loop, daemon=True).start()
+
+    def start(self):
+        """Start the worker and wait until its model is loaded; raises if loading fails."""
+        pipes = [self.context.Pipe() for _ in range(self.channels)]
+        self.conns = [conn for conn, _ in pipes]
+        child_conns = [child_conn for _, child_conn in pipes]
+        self.process = self.context.Process(target=worker_main, args=(child_conns, self.factory, self.args, self.kwargs),
+                                            daemon=True)
+        self.process.start()
+        for child_conn in child_conns:
+            child_conn.close()
+        self.generation += 1
+        status, detail = self.receive(self.conns[0], STARTUP_TIMEOUT)
+        if status != "ready":
+            self.kill()
+            raise RuntimeError(f"Model worker failed to start: {detail}")
+
+    def receive(self, conn, timeout):
+        """Wait for the worker's reply on `conn`; returns ("dead", reason) if it crashed or hung."""
+        try:
+            if conn.poll(timeout):
+                return conn.recv()
+        except (EOFError, OSError):
+            self.process.join(timeout=1)
+            return "dead", f"worker exited with code {self.process.exitcode}"
+        return "dead", f"no reply within {timeout:.0f}s"
+
+    def kill(self):
+        if self.process is not None and self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout=5)
+        for conn in self.conns:
+            conn.close()
+
+    def restart(self, reason, generation):
+        """Replace a dead worker, giving up after MAX_RESTARTS consecutive failures.
+
+        Does nothing if the worker was already replaced since `generation`, e.g. by another channel
+        that saw the same crash.
+        """
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.kill()
+            while not self.closed:
+                self.restarts += 1
+                self.log(f"Model worker failed ({reason}), restarting (attempt {self.restarts})...")
+                try:
+                    self.start()
+                    self.restarts = 0
+                    return
+                except Exception as e:
+                    reason = str(e)
+                    if self.restarts >= MAX_RESTARTS:
+                        raise
+                    time.sleep(min(30, 2 ** self.restarts))
+
+    def shared_audio(self, index, audio):
+        """Copy audio into the channel's shared block, growing it when an utterance doesn't fit."""
+        block = self.blocks[index]
+        if block is None or block.size < audio.nbytes:
+            if block is not None:
+                block.close()
+                block.unlink()
+            block = self.blocks[index] = shared_memory.SharedMemory(create=True, size=max(audio.nbytes, 16000 * 4 * 30))
+        np.ndarray(audio.shape, dtype=np.float32, buffer=block.buf)[:] = audio
+        return block.name
+
+    def transcribe(self, audio, **options):
+        """Same call and return shape as WhisperModel.transcribe; the segments are already decoded."""
+        audio = np.ascontiguousarray(audio, dtype=np.float32).reshape(-1)
+        timeout = max(MIN_DECODE_TIMEOUT, 10 * len(audio) / 16000)
+        index = self.idle.get()  # Waits while all num_workers channels are busy
+        try:
+            for attempt in range(2):
+                with self.lock:
+                    conn, generation = self.conns[index], self.generation
+                name = self.shared_audio(index, audio)
+                try:
+                    conn.send(("transcribe", name, len(audio), options))
+                    status, result = self.receive(conn, timeout)
+                except (BrokenPipeError, OSError) as e:
+                    status, result = "dead", str(e)
+                if status == "result":
+                    segments, info = result
+                    return iter([from_plain(segment) for segment in segments]), SimpleNamespace(**info)
+                if status == "error":
+                    raise RuntimeError(f"Decode failed in model worker: {result}")
+                self.restart(result, generation)  # Retry once on a fresh worker
+        finally:
+            self.idle.put(index)
+        raise RuntimeError(f"Model worker failed twice on the same utterance: {result}")
+
+    def acquire_all(self, blocking=True):
+        """Take every channel, so nothing else talks to the worker; returns those taken if not all were free."""
+        taken = []
+        try:
+            while len(taken) < self.channels:
+                taken.append(self.idle.get(block=blocking))
+        except queue.Empty:
+            pass
+        return taken
+
+    def release(self, taken):
+        for index in taken:
+            self.idle.put(index)
+
+    def health_loop(self):
+        """Ping the worker while it is idle and restart it if it died or stopped answering."""
+        while not self.closed:
+            time.sleep(HEALTH_INTERVAL)
+            taken = self.acquire_all(blocking=False)
+            try:
+                if len(taken) < self.channels or self.closed:
+                    continue  # Busy decoding; transcribe notices crashes itself
+                generation = self.generation
+                try:
+                    self.conns[0].send(("ping",))
+                    status, detail = self.receive(self.conns[0], HEALTH_TIMEOUT)
+                except (BrokenPipeError, OSError) as e:
+                    status, detail = "dead", str(e)
+                if status != "pong":
+                    self.restart(detail, generation)
+            except Exception as e:
+                self.log(f"Model worker could not be restarted: {e}")
+            finally:
+                self.release(taken)
+
+    def close(self):
+        """Stop the worker and free the shared blocks."""
+        taken = self.acquire_all()  # Lets decodes in flight finish
+        with self.lock:
+            self.closed = True
+            try:
+                self.conns[0].send(("stop",))
+            except (BrokenPipeError, OSError):
+                pass
+            self.process.join(timeout=5)
+            self.kill()
+            for index, block in enumerate(self.blocks):
+                if block is not None:
+                    block.close()
+                    block.unlink()
+                    self.blocks[index] = None
+        self.release(taken)
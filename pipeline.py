@@ -0,0 +1,320 @@
+# pipeline.py
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from metrics import NULL_SPAN
+from transcriber import same_transcript
+
+# Backpressure policies for the capture -> transcription queue
+BLOCK = "block"  # Capture waits until the transcriber catches up
+DROP_OLDEST = "drop_oldest"  # The oldest waiting utterance is discarded
+MERGE = "merge"  # The new utterance is appended to the last waiting one
+POLICIES = (BLOCK, DROP_OLDEST, MERGE)
+
+# What a send-stage item carries
+FINAL = "final"  # The only transcription of the utterance
+DRAFT = "draft"  # Cascade mode: quick small-model text, may be replaced later
+CORRECTION = "correction"  # Cascade mode: main-model text replacing the draft
+STREAMED = "streamed"  # Segment streaming: the segments went out during decoding, only the end marker is left
+
+
+class Utterance:
+    def __init__(self, index, audio, prefix=""):
+        self.index = index
+        self.audio = audio
+        self.prefix = prefix  # Text already committed by streaming partials
+        self.span = NULL_SPAN
+        self.text = ""
+        self.captured_at = time.perf_counter()
+        self.captured_time = time.time()  # Wall clock, for latencies measured on other machines
+        self.decoded_time = None
+        self.decode_started_at = None
+        self.decode_time = 0.0
+        self.details = {}  # Language and confidence reported by the transcriber
+        self.kind = FINAL
+        self.segments = 0  # Segments already streamed
+        self.source = None  # Multi-source capture: label of the input it came from
+        self.utterance_id = uuid.uuid4().hex  # Drafts, corrections and v1 payloads refer to it
+
+
+class STTPipeline:
+    """Runs capture, transcription and sending as three threads joined by bounded queues."""
+
+    def __init__(self, transcriber, record, send, log, max_queue=2, policy=BLOCK, tracer=None,
+                 send_draft=None, send_correction=None, send_segment=None, send_segment_end=None, batch_size=1):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        self.transcriber = transcriber
+        self.record = record  # Blocking call that returns the next utterance's audio
+        self.send = send
+        self.log = log
+        self.policy = policy
+        self.tracer = tracer
+        self.decode_queue = queue.Queue(maxsize=max_queue)
+        self.send_queue = queue.Queue(maxsize=max_queue)
+        self.running = False
+        self.threads = []
+        self.count = 0
+
+        # Utterances already waiting when a decode starts (e.g. from several input sources) are decoded
+        # together, sharing the model's workers; results are still sent in capture order
+        self.batch_size = batch_size
+        self.batch_pool = None
+
+        # Cascade mode (transcriber has a draft model): the main model re-decodes in the background
+        self.send_draft = send_draft  # send_draft(utterance_id, text)
+        self.send_correction = send_correction  # send_correction(utterance_id, text)
+        self.cascade = transcriber.draft_model_size is not None and send_draft is not None
+        self.correction_pool = None
+        self.corrections_pending = 0
+        self.max_corrections = max_queue  # Beyond this backlog the draft is left standing
+        self.lock = threading.Lock()
+
+        # Segment streaming: each segment is sent from the decode thread as soon as the model yields it.
+        # The cascade already gets text out early, and its corrections replace whole utterances.
+        self.send_segment = send_segment  # send_segment(utterance_id, index, text)
+        self.send_segment_end = send_segment_end  # send_segment_end(utterance_id, count, text, meta)
+        self.streaming = send_segment is not None and not self.cascade
+
+    def start(self):
+        """Start the three stage threads."""
+        self.running = True
+        if self.cascade:
+            self.correction_pool = ThreadPoolExecutor(max_workers=1)
+        if self.batch_size > 1:
+            self.batch_pool = ThreadPoolExecutor(max_workers=self.batch_size)
+        self.threads = [
+            threading.Thread(target=self.capture_loop, daemon=True),
+            threading.Thread(target=self.decode_loop, daemon=True),
+            threading.Thread(target=self.send_loop, daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        """Stop all stages; whatever is still queued is discarded."""
+        with self.lock:  # Nothing is submitted to a pool once it is shut down
+            self.running = False
+            if self.correction_pool:
+                self.correction_pool.shutdown(wait=False, cancel_futures=True)
+                self.correction_pool = None
+            if self.batch_pool:
+                self.batch_pool.shutdown(wait=False)  # A batch in progress finishes; its results are discarded
+                self.batch_pool = None
+        for stage_queue in (self.decode_queue, self.send_queue):
+            while True:
+                try:
+                    stage_queue.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                stage_queue.put_nowait(None)
+            except queue.Full:
+                pass
+
+    def capture_loop(self):
+        while self.running:
+            recording = self.record()
+            if not self.running:
+                break
+            if len(recording) == 0 and not self.transcriber.committed_text.strip():
+                continue
+            # Views into the capture ring buffer would be overwritten while they wait in the queue
+            if not recording.flags.owndata:
+                recording = recording.copy()
+            self.count += 1
+            utterance = Utterance(self.count, recording, self.transcriber.committed_text)
+            utterance.source = self.transcriber.last_source
+            if self.transcriber.last_utterance_id:
+                utterance.utterance_id = self.transcriber.last_utterance_id  # The ID its stt_partial messages used
+            if self.tracer:
+                utterance.span = self.tracer.start_span(self.count)
+                if self.transcriber.last_key_press is not None:
+                    utterance.span.mark("key_press", at=self.transcriber.last_key_press)
+                utterance.span.mark("capture_end", at=utterance.captured_at)
+                if utterance.source is not None:
+                    utterance.span.set("source", utterance.source)
+            self.enqueue(utterance)
+
+    def enqueue(self, utterance):
+        """Hand an utterance to the transcription stage according to the backpressure policy."""
+        # Text committed by streaming partials can't be merged into another utterance's audio
+        if self.policy == BLOCK or (self.policy == MERGE and utterance.prefix):
+            self.decode_queue.put(utterance)
+            return
+        with self.decode_queue.mutex:
+            waiting = self.decode_queue.queue
+            if len(waiting) < self.decode_queue.maxsize:
+                waiting.append(utterance)
+                self.decode_queue.unfinished_tasks += 1
+                self.decode_queue.not_empty.notify()
+                return
+            if self.policy == DROP_OLDEST:
+                dropped = waiting.popleft()
+                waiting.append(utterance)
+                message = f"Pipeline backlog full, dropped utterance #{dropped.index}"
+            elif waiting[-1].source == utterance.source:
+                last = waiting[-1]
+                last.audio = np.concatenate((last.audio, utterance.audio))
+                message = f"Pipeline backlog full, merged utterance #{utterance.index} into #{last.index}"
+            else:
+                message = None  # Another speaker's audio can't be merged in; wait for room instead
+        if message is None:
+            self.decode_queue.put(utterance)
+            return
+        self.log(message)
+
+    def decode_loop(self):
+        while self.running:
+            utterance = self.decode_queue.get()
+            if utterance is None:
+                break
+            batch = [utterance]
+            while len(batch) < self.batch_size:
+                try:
+                    utterance = self.decode_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if utterance is None:
+                    break  # Stopping
+                batch.append(utterance)
+            results = None
+            if len(batch) > 1:
+                with self.lock:
+                    if self.batch_pool:  # Gone once stop() has run
+                        results = self.batch_pool.map(self.decode, batch)
+            if results is not None:
+                decoded = list(results)
+                self.log(f"Decoded a batch of {len(batch)} utterances "
+                         f"({', '.join(f'#{item.index}' for item in batch)})")
+            else:
+                decoded = [self.decode(utterance) for utterance in batch]
+            for utterance, ok in zip(batch, decoded):
+                if ok and self.running:
+                    self.send_queue.put(utterance)
+                    if self.cascade:
+                        self.submit_correction(utterance)
+                self.decode_queue.task_done()
+
+    def decode(self, utterance):
+        """Transcribe one utterance; returns False if the decode failed."""
+        utterance.decode_started_at = time.perf_counter()
+        if self.cascade:
+            utterance.kind = DRAFT
+        elif self.streaming:
+            utterance.kind = STREAMED
+        on_segment = (lambda index, text: self.stream_segment(utterance, index, text)) if self.streaming else None
+        try:
+            utterance.text = self.transcriber.transcribe_audio(utterance.audio, prefix=utterance.prefix,
+                                                               span=utterance.span, draft=self.cascade,
+                                                               details=utterance.details, on_segment=on_segment,
+                                                               source=utterance.source)
+        except Exception as e:
+            # A failed decode (e.g. remote server unreachable) loses this utterance, not the pipeline
+            self.log(f"Utterance #{utterance.index}: transcription failed: {e}")
+            return False
+        utterance.decode_time = time.perf_counter() - utterance.decode_started_at
+        utterance.decoded_time = time.time()
+        return True
+
+    def stream_segment(self, utterance, index, text):
+        """Send one segment while the rest of the utterance is still decoding."""
+        if index == (1 if utterance.prefix.strip() else 0):  # The first segment this decode produced
+            utterance.span.mark("first_segment")
+        self.send_segment(utterance.utterance_id, index, text)
+        utterance.segments += 1
+
+    def submit_correction(self, draft):
+        """Queue the main-model decode of a drafted utterance, unless the corrector is too far behind."""
+        with self.lock:
+            if self.correction_pool is None:
+                return  # Stopped while the draft was decoding
+            if self.corrections_pending >= self.max_corrections:
+                self.log(f"Correction backlog full, keeping the draft of utterance #{draft.index}")
+                return
+            self.corrections_pending += 1
+            self.correction_pool.submit(self.correct, draft)
+
+    def correct(self, draft):
+        """Decode an utterance with the main model; queue a correction only if the text changed."""
+        try:
+            correction = Utterance(draft.index, draft.audio, draft.prefix)
+            # Without a draft to replace (it was empty), the main model's text is simply the transcription
+            correction.kind = CORRECTION if draft.text.strip() else FINAL
+            correction.utterance_id = draft.utterance_id
+            correction.source = draft.source
+            correction.decode_started_at = time.perf_counter()
+            correction.captured_time = draft.captured_time
+            correction.text = self.transcriber.transcribe_audio(draft.audio, prefix=draft.prefix,
+                                                                details=correction.details, source=draft.source)
+            correction.decode_time = time.perf_counter() - correction.decode_started_at
+            correction.decoded_time = time.time()
+        except Exception as e:
+            self.log(f"Utterance #{draft.index}: correction failed, keeping the draft: {e}")
+            return
+        finally:
+            with self.lock:
+                self.corrections_pending -= 1
+        if same_transcript(correction.text, draft.text):
+            self.log(f"Utterance #{draft.index}: draft confirmed by the main model "
+                     f"(decode {correction.decode_time:.2f}s)")
+        elif self.running:
+            self.send_queue.put(correction)
+
+    def send_loop(self):
+        while self.running:
+            utterance = self.send_queue.get()
+            if utterance is None:
+                break
+            start = time.perf_counter()
+            if utterance.kind == CORRECTION:
+                self.send_correction(utterance.utterance_id, utterance.text)
+                self.log(f"Utterance #{utterance.index}: sent correction (decode {utterance.decode_time:.2f}s)")
+                self.send_queue.task_done()
+                continue
+
+            utterance.span.mark("emit_start", at=start)
+            if utterance.kind == STREAMED:
+                if utterance.segments:
+                    self.send_segment_end(utterance.utterance_id, utterance.segments, utterance.text, {
+                        "source": utterance.source,
+                        "captured_at": utterance.captured_time,
+                        "decoded_at": utterance.decoded_time,
+                        "confidence": utterance.details.get("confidence"),
+                    })
+            elif utterance.text.strip():
+                if utterance.kind == DRAFT:
+                    self.send_draft(utterance.utterance_id, utterance.text)
+                else:
+                    self.send(utterance.text, {
+                        "utterance_id": utterance.utterance_id,
+                        "source": utterance.source,
+                        "captured_at": utterance.captured_time,
+                        "decoded_at": utterance.decoded_time,
+                        "confidence": utterance.details.get("confidence"),
+                    })
+            utterance.span.mark("emit_end")
+            send_time = time.perf_counter() - start
+            label = f"#{utterance.index}" if utterance.source is None else f"#{utterance.index} [{utterance.source}]"
+            if utterance.kind == DRAFT:
+                label += " draft"
+            elif utterance.kind == STREAMED:
+                label += f" ({utterance.segments} segments streamed)"
+            self.log(
+                f"Utterance {label}: audio {len(utterance.audio) / self.transcriber.sample_rate:.2f}s, "
+                f"wait {utterance.decode_started_at - utterance.captured_at:.2f}s, "
+                f"decode {utterance.decode_time:.2f}s, send {send_time:.3f}s "
+                f"(queued: decode={self.decode_queue.qsize()}, send={self.send_queue.qsize()})"
+            )
+            if self.tracer:
+                self.tracer.finish(utterance.span)
+            self.send_queue.task_done()
+
+    def idle(self):
+        """True when no utterance is waiting in, or moving between, the decode and send stages."""
+        with self.lock:
+            corrections = self.corrections_pending
+        return not (self.decode_queue.unfinished_tasks or self.send_queue.unfinished_tasks or corrections)
@@ -0,0 +1,87 @@
+# remote_model.py
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+import numpy as np
+from model_process import from_plain
+
+# Remote transcription timeouts (in seconds)
+CONNECT_TIMEOUT = 10.0  # How long a decode waits for the link to come up
+MIN_RESULT_TIMEOUT = 30.0  # A result slower than this, or 5x real time, is given up on
+
+dispatcher_lock = threading.Lock()
+
+
+class ResultDispatcher:
+    """The single stt_remote_result handler of a client, routing results to waiters by utterance_id.
+
+    socket.io keeps one handler per event, so every RemoteModel on a client (e.g. the main and the
+    cascade draft model) shares this one.
+    """
+
+    def __init__(self):
+        self.pending = {}  # utterance_id -> [Event, result]
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def for_client(client):
+        with dispatcher_lock:
+            dispatcher = getattr(client, "remote_results", None)
+            if dispatcher is None:
+                dispatcher = client.remote_results = ResultDispatcher()
+                client.sio.on("stt_remote_result", dispatcher.on_result)
+            return dispatcher
+
+    def expect(self, utterance_id):
+        waiter = [threading.Event(), None]
+        with self.lock:
+            self.pending[utterance_id] = waiter
+        return waiter
+
+    def forget(self, utterance_id):
+        with self.lock:
+            del self.pending[utterance_id]
+
+    def on_result(self, data):
+        with self.lock:
+            waiter = self.pending.get(data.get("utterance_id"))
+        if waiter is not None:
+            waiter[1] = data
+            waiter[0].set()
+
+
+class RemoteModel:
+    """Drop-in for WhisperModel that sends the audio to a TranscriptionServer over the client's socket.
+
+    The client loads no model at all; utterances are streamed as int16 PCM chunks and the decoded
+    segments come back as stt_remote_result.
+    """
+
+    def __init__(self, model_size=None, client=None, **kwargs):
+        self.model_size = model_size  # Requested from the server, which falls back to its main model
+        self.client = client
+        self.results = ResultDispatcher.for_client(client)
+
+    def transcribe(self, audio, **options):
+        """Same call and return shape as WhisperModel.transcribe."""
+        deadline = time.monotonic() + CONNECT_TIMEOUT
+        while not self.client.is_connected and time.monotonic() < deadline:
+            time.sleep(0.1)
+
+        audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+        pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16).tobytes()  # Half the size of float32
+        utterance_id = uuid.uuid4().hex
+        waiter = self.results.expect(utterance_id)
+        try:
+            if not self.client.send_audio(utterance_id, pcm, dict(options, model_size=self.model_size)):
+                raise RuntimeError("Remote transcription failed: not connected to the server.")
+            if not waiter[0].wait(max(MIN_RESULT_TIMEOUT, 5 * len(audio) / 16000)):
+                raise RuntimeError("Remote transcription timed out.")
+        finally:
+            self.results.forget(utterance_id)
+
+        result = waiter[1]
+        if "error" in result:
+            raise RuntimeError(f"Remote transcription failed: {result['error']}")
+        return iter([from_plain(segment) for segment in result["segments"]]), SimpleNamespace(**result["info"])
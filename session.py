@@ -0,0 +1,282 @@
+# session.py
+import argparse
+import os
+import struct
+import threading
+import time
+import numpy as np
+
+# Session file layout: header, then a stream of audio and key records in capture order
+MAGIC = b"STTS"
+VERSION = 1
+HEADER = struct.Struct("<4sBI")  # magic, version, sample rate
+AUDIO_RECORD = struct.Struct("<cI")  # b"A", sample count; followed by int16 PCM
+KEY_RECORD = struct.Struct("<cQBB")  # b"K", frame position, 1 = press / 0 = release, key name length; then the name
+
+
+def key_name(key):
+    """Name of a pynput key (or plain string) as HotkeyListener.matches understands it."""
+    if isinstance(key, str):
+        return key
+    return getattr(key, "char", None) or getattr(key, "name", None) or str(key)
+
+
+class SessionRecorder:
+    """Writes the raw capture stream and push-to-talk key events to a compact binary session file.
+
+    Key events are stamped with their position in the audio stream (in samples), so a replay
+    reproduces them at exactly the same point regardless of replay speed. Only keybind events are
+    recorded, never other typing.
+    """
+
+    def __init__(self, file_path, capture, hotkey):
+        self.file_path = file_path
+        self.capture = capture
+        self.hotkey = hotkey
+        self.file = None
+        self.lock = threading.Lock()
+        self.frames = 0  # Samples recorded so far
+        self.last_write = None  # perf_counter time of the last audio block, to place key events inside it
+
+    def start(self):
+        self.file = open(self.file_path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, self.capture.sample_rate))
+        self.capture.on_write = self.on_audio
+        self.hotkey.on_key = self.on_key
+        print(f"Recording session to {self.file_path}")
+
+    def close(self):
+        self.capture.on_write = None
+        self.hotkey.on_key = None
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+                print(f"Session saved ({self.frames / self.capture.sample_rate:.1f}s of audio).")
+
+    def on_audio(self, samples):
+        pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(AUDIO_RECORD.pack(b"A", len(pcm)))
+            self.file.write(pcm.tobytes())
+            self.frames += len(pcm)
+            self.last_write = time.perf_counter()
+
+    def on_key(self, kind, key):
+        with self.lock:
+            if self.file is None:
+                return
+            # The block containing this moment hasn't been delivered yet; estimate the offset into it
+            frame = self.frames
+            if self.last_write is not None:
+                elapsed = min(time.perf_counter() - self.last_write, self.capture.blocksize / self.capture.sample_rate)
+                frame += int(elapsed * self.capture.sample_rate)
+            name = key_name(key).encode("utf-8")
+            self.file.write(KEY_RECORD.pack(b"K", frame, 1 if kind == "press" else 0, len(name)))
+            self.file.write(name)
+
+
+def load_session(file_path):
+    """Read a session file; returns (sample_rate, float32 audio, [(frame, "press" | "release", key name)])."""
+    with open(file_path, "rb") as f:
+        data = f.read()
+    magic, version, sample_rate = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{file_path} is not a version {VERSION} session file")
+    chunks, events = [], []
+    offset = HEADER.size
+    while offset < len(data):
+        if data[offset:offset + 1] == b"A":
+            _, count = AUDIO_RECORD.unpack_from(data, offset)
+            offset += AUDIO_RECORD.size
+            chunks.append(np.frombuffer(data, dtype=np.int16, count=count, offset=offset))
+            offset += count * 2
+        else:
+            _, frame, pressed, length = KEY_RECORD.unpack_from(data, offset)
+            offset += KEY_RECORD.size
+            events.append((frame, "press" if pressed else "release", data[offset:offset + length].decode("utf-8")))
+            offset += length
+    audio = np.concatenate(chunks).astype(np.float32) / 32768.0 if chunks else np.array([], dtype=np.float32)
+    return sample_rate, audio, events
+
+
+class SessionReplayer:
+    """Feeds a recorded session back through a transcriber wired to the fake audio and keyboard backends."""
+
+    def __init__(self, file_path):
+        self.sample_rate, self.audio, self.events = load_session(file_path)
+
+    def prepare(self, transcriber):
+        """Swap the transcriber's capture and hotkey backends for the fakes; call before capture starts."""
+        from fakes import FakeInputStream, FakeKeyListener
+
+        capture = transcriber.capture
+        capture.stop()
+        capture.stream_factory = FakeInputStream
+        transcriber.hotkey.stop()
+        transcriber.hotkey.listener_factory = FakeKeyListener
+        # Hold durations are measured on the audio clock, so the debounce decision doesn't depend on speed
+        transcriber.hotkey.clock = lambda: capture.frames_written / capture.sample_rate
+
+    def replay(self, transcriber, speed=1.0, timeout=10.0):
+        """Play the session at `speed` times real time (0 = as fast as possible); key events land on their sample."""
+        from fakes import FakeInputStream
+
+        capture = transcriber.capture
+        deadline = time.monotonic() + timeout
+        while (capture.stream is None or transcriber.hotkey.listener is None) and time.monotonic() < deadline:
+            time.sleep(0.01)  # The pipeline's capture thread opens both on its first record call
+        if capture.stream is None or transcriber.hotkey.listener is None:
+            raise RuntimeError("Capture and hotkey listener were never started")
+        stream = capture.stream
+        if not isinstance(stream, FakeInputStream):
+            raise RuntimeError("Call prepare() before capture starts")
+
+        position = 0
+        for frame, kind, key in self.events:
+            stream.feed(self.audio[position:frame], speed)
+            position = max(position, frame)
+            listener = transcriber.hotkey.listener
+            if listener is None:
+                continue
+            if kind == "press":
+                listener.press(key)
+            else:
+                listener.release(key)
+                if not speed:
+                    # Unpaced, the ring buffer could otherwise wrap over this utterance before it is collected
+                    while not transcriber.hotkey.events.empty() and time.monotonic() < deadline + 30:
+                        time.sleep(0.001)
+        stream.feed(self.audio[position:], speed)
+
+    def summary(self, threshold):
+        """Key presses in the session and how many pass the debounce threshold."""
+        presses = accepted = 0
+        press_frame = None
+        for frame, kind, _ in self.events:
+            if kind == "press" and press_frame is None:
+                press_frame = frame
+                presses += 1
+            elif kind == "release" and press_frame is not None:
+                accepted += (frame - press_frame) / self.sample_rate >= threshold
+                press_frame = None
+        return {"audio_seconds": round(len(self.audio) / self.sample_rate, 2), "presses": presses,
+                "accepted": accepted}
+
+
+def record_session(config, file_path):
+    """Record from the real microphone and keyboard until interrupted."""
+    from sttclient import build_transcriber
+
+    transcriber = build_transcriber(config, print)
+    recorder = SessionRecorder(file_path, transcriber.capture, transcriber.hotkey)
+    recorder.start()
+    transcriber.capture.start(device=config.get("mic_index"))
+    transcriber.hotkey.start()
+    print(f"Hold '{transcriber.hotkey.keybind}' to talk; Ctrl+C to finish.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    transcriber.stop_listening()
+    recorder.close()
+
+
+def replay_session(config, file_path, speed=1.0, stub_rtf=None, ui=False, port=5055):
+    """Replay a session through the client pipeline (or the Tk app), sending to a local server; returns a report."""
+    from local_server import LocalServer
+
+    replayer = SessionReplayer(file_path)
+    server = LocalServer(port=port)
+    server.start()
+    config = dict(config, server_url=server.url, vad_mode=False, preload_model=False)
+    if stub_rtf is not None:
+        from fakes import StubModel
+        model_factory = lambda model_size, **kwargs: StubModel(rtf=stub_rtf, sample_rate=replayer.sample_rate)
+    else:
+        model_factory = None
+
+    if ui:
+        import tkinter as tk
+        from main import STTClientApp
+
+        root = tk.Tk()
+        app = STTClientApp(root, config, config_path=os.devnull)  # Don't overwrite the real config
+        transcriber = app.transcriber
+        transcriber.models.model_factory = model_factory or transcriber.models.model_factory
+        replayer.prepare(transcriber)
+        app.toggle_stt()
+        worker = threading.Thread(target=replayer.replay, args=(transcriber, speed), daemon=True)
+        worker.start()
+
+        def wait_for_replay():
+            if worker.is_alive():
+                root.after(100, wait_for_replay)
+            else:
+                root.after(2000, root.quit)  # Let the last utterance get through
+        root.after(100, wait_for_replay)
+        root.mainloop()
+        pipeline = app.pipeline
+        app.toggle_stt()
+        websocket_client = app.websocket_client
+    else:
+        from sttclient import build_pipeline, build_tracer, build_transcriber, build_websocket_client
+
+        websocket_client = build_websocket_client(config, lambda data: None, print)
+        transcriber = build_transcriber(config, print, websocket_client=websocket_client)
+        transcriber.models.model_factory = model_factory or transcriber.models.model_factory
+        replayer.prepare(transcriber)
+        websocket_client.connect_socket()
+        transcriber.load_model()
+        tracer = build_tracer(config, print)
+        websocket_client.latency_callback = tracer.observe
+        pipeline = build_pipeline(config, transcriber, websocket_client, print, tracer)
+        pipeline.start()
+        replayer.replay(transcriber, speed)
+
+    # Wait until everything captured has been decoded and sent
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline and not (pipeline.idle() and not websocket_client.backlog()
+                                               and transcriber.capture.utterance_start is None
+                                               and transcriber.hotkey.events.empty()):
+        time.sleep(0.1)
+    time.sleep(0.5)  # The last message is in flight to the server
+    if not ui:
+        pipeline.stop()
+        transcriber.stop_listening()
+    websocket_client.disconnect_socket()
+    server.stop()
+
+    report = replayer.summary(transcriber.hotkey.threshold)
+    report["utterances"] = pipeline.count
+    report["sent"] = [data for _, event, data in list(server.received.queue) if event == "stt_transcription"]
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record and replay push-to-talk sessions (audio plus key timing)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="Record microphone audio and keybind events")
+    record.add_argument("file", help="Session file to write")
+    replay = commands.add_parser("replay", help="Replay a session through the client with fake devices")
+    replay.add_argument("file", help="Session file to read")
+    replay.add_argument("--speed", type=float, default=1.0, help="Replay speed relative to real time (0 = unpaced)")
+    replay.add_argument("--stub-rtf", type=float, default=None, help="Decode with a stub model at this real-time factor")
+    replay.add_argument("--ui", action="store_true",
+                        help="Drive the Tk app instead of the headless pipeline (needs a display, e.g. xvfb-run)")
+    replay.add_argument("--port", type=int, default=5055, help="Port for the local socket.io server")
+    for command in (record, replay):
+        command.add_argument("--config", default="stt_config.json", help="Config file (model, keybind, ...)")
+    args = parser.parse_args()
+
+    import json
+    from config import load_config
+
+    config = load_config(args.config)
+    if args.command == "record":
+        record_session(config, args.file)
+    else:
+        print(json.dumps(replay_session(config, args.file, args.speed, args.stub_rtf, args.ui, args.port), indent=2))
@@ -0,0 +1,215 @@
+# sttclient.py
+"""Command-line entry point: `python -m sttclient` opens the UI, `--headless` runs without Tk.
+
+Heavy dependencies (faster_whisper, sounddevice, pynput, scipy, tkinter) are only imported by the
+components that need them, when they are first used.
+"""
+import argparse
+import signal
+import threading
+from config import CONFIG_FILE, load_config
+
+
+def build_websocket_client(config, on_message, log):
+    """Create the threaded or asyncio WebSocket client selected in the config."""
+    from websocket_client import WebSocketClient, SERVER_URL, BATCH_THRESHOLD
+    if config.get("async_client", False):
+        from async_websocket_client import AsyncWebSocketClient as client_class
+    else:
+        client_class = WebSocketClient
+    return client_class(
+        on_message,
+        log,
+        config.get("server_url", SERVER_URL),
+        spill_file=config.get("outbox_spill_file"),
+        protocol=config.get("message_protocol", "plain"),
+        batch_threshold=config.get("outbox_batch_threshold", BATCH_THRESHOLD)
+    )
+
+
+def build_postprocessor(config):
+    """Create the post-processor; config entries override the built-in replacement table."""
+    from transcriber import PostProcessor, DEFAULT_STAGES
+    postprocessor = PostProcessor(
+        replacements=config.get("word_replacements"),
+        stages=config.get("postprocess_stages", DEFAULT_STAGES)
+    )
+    if config.get("replacements_file"):
+        postprocessor.load_replacements(config["replacements_file"])
+    return postprocessor
+
+
+def decode_batch_size(config):
+    """Utterances decoded concurrently on one model: by default one per configured input source."""
+    return config.get("decode_batch_size", len(config.get("input_sources") or ()) or 1)
+
+
+def build_transcriber(config, log, on_partial=None, websocket_client=None):
+    """Create the transcriber, its model manager and post-processor from the config."""
+    from model_manager import ModelManager
+    from transcriber import DecodingPolicy, WhisperTranscriber, NO_SPEECH_THRESHOLD, LOGPROB_THRESHOLD
+
+    # Optionally decode in a child process, so inference never competes with the UI for the GIL
+    model_factory = None
+    device = config.get("device", "auto")
+    if config.get("remote_transcription", False):
+        # Decoding happens on a TranscriptionServer behind server_url; nothing is loaded locally
+        from functools import partial
+        from remote_model import RemoteModel
+        model_factory = partial(RemoteModel, client=websocket_client)
+        device = "cpu"  # Skips probing for CUDA
+    elif config.get("model_process", False):
+        from functools import partial
+        from model_process import ProcessModel
+        model_factory = partial(ProcessModel, log=log)
+
+    # Models are cached across STT toggles and evicted once idle
+    models = ModelManager(
+        device=device,
+        compute_type=config.get("compute_type", "auto"),
+        cpu_threads=config.get("cpu_threads", 0),
+        num_workers=max(config.get("num_workers", 1), decode_batch_size(config)),  # One shared model serves all
+        idle_timeout=config.get("model_idle_timeout", 600),
+        log=log,
+        model_factory=model_factory
+    )
+
+    transcriber = WhisperTranscriber(
+        model_size=config.get("model_size", "medium"),
+        pre_roll=config.get("pre_roll_seconds", 0.3),
+        max_utterance=config.get("max_utterance_seconds", 60.0),
+        dump_dir=config.get("dump_utterances_dir"),
+        on_partial=on_partial if config.get("streaming_partials", False) else None,
+        partial_interval=config.get("partial_interval_seconds", 0.5),
+        vad_settings=config.get("vad_settings"),
+        models=models,
+        postprocessor=build_postprocessor(config),
+        parallel_workers=config.get("num_workers", 1),
+        trim_silence=config.get("trim_silence", True),
+        no_speech_threshold=config.get("no_speech_threshold", NO_SPEECH_THRESHOLD),
+        logprob_threshold=config.get("logprob_threshold", LOGPROB_THRESHOLD),
+        policy=DecodingPolicy(
+            language=config.get("language"),
+            lock_after=config.get("language_lock_utterances", 3),
+            latency_target=config.get("latency_target_seconds"),
+            carry_context=config.get("carry_context", False)
+        ),
+        draft_model_size=config.get("cascade_draft_model"),
+        sources=config.get("input_sources")
+    )
+    transcriber.set_keybind(config.get("keybind", "space"))
+    return transcriber
+
+
+def build_tracer(config, log):
+    """Create the per-utterance tracer; it costs a no-op call per stage when disabled."""
+    from metrics import Tracer
+    return Tracer(
+        enabled=config.get("tracing", False),
+        jsonl_path=config.get("trace_file", "stt_spans.jsonl"),
+        prometheus_port=config.get("metrics_port"),
+        log=log
+    )
+
+
+def build_pipeline(config, transcriber, websocket_client, log, tracer):
+    """Create the capture -> transcription -> send pipeline for the configured trigger mode."""
+    from pipeline import STTPipeline
+    if transcriber.sources:
+        record = transcriber.record_sources  # Each source is segmented by its own VAD
+    elif config.get("vad_mode", False):
+        record = transcriber.record_vad_segment
+    else:
+        record = transcriber.record_audio
+    return STTPipeline(
+        transcriber,
+        record,
+        websocket_client.send_message,
+        log,
+        max_queue=config.get("pipeline_queue_size", 2),
+        policy=config.get("backpressure_policy", "block"),
+        tracer=tracer,
+        send_draft=websocket_client.send_draft,
+        send_correction=websocket_client.send_correction,
+        send_segment=websocket_client.send_segment if config.get("stream_segments", False) else None,
+        send_segment_end=websocket_client.send_segment_end,
+        batch_size=decode_batch_size(config)
+    )
+
+
+def run_headless(config):
+    """Run the capture -> transcribe -> send pipeline without a UI until interrupted."""
+    log = print
+    websocket_client = build_websocket_client(config, lambda data: None, log)
+    transcriber = build_transcriber(config, log, on_partial=websocket_client.send_partial,
+                                    websocket_client=websocket_client)
+    tracer = build_tracer(config, log)
+    websocket_client.latency_callback = tracer.observe
+
+    websocket_client.connect_socket()
+    log("Loading model...")
+    transcriber.load_model()
+    if not transcriber.sources:
+        transcriber.capture.start(device=config.get("mic_index"))
+    pipeline = build_pipeline(config, transcriber, websocket_client, log, tracer)
+    pipeline.start()
+    if transcriber.sources:
+        log(f"Listening to {', '.join(transcriber.sources.captures)} (hands-free)...")
+    else:
+        log("Listening (hands-free)..." if config.get("vad_mode", False) else
+            f"Listening (hold '{config.get('keybind', 'space')}' to talk)...")
+
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *args: stop.set())
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    while not stop.wait(1.0):
+        pass
+
+    log("Shutting down...")
+    pipeline.stop()
+    transcriber.stop_listening()
+    transcriber.unload_model()
+    websocket_client.disconnect_socket()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="sttclient", description="Live speech-to-text WebSocket client")
+    parser.add_argument("--headless", action="store_true", help="Run without the Tk window")
+    parser.add_argument("--config", default=CONFIG_FILE, help="Path to the JSON config file")
+    parser.add_argument("--server-url", help="socket.io server to send transcriptions to")
+    parser.add_argument("--model", dest="model_size", help="Whisper model size (e.g. tiny, base, medium)")
+    parser.add_argument("--device", help="Inference device: auto, cpu or cuda")
+    parser.add_argument("--compute-type", help="CTranslate2 compute type (e.g. int8, float16)")
+    parser.add_argument("--mic", dest="mic_index", type=int, help="Input device index")
+    parser.add_argument("--keybind", help="Push-to-talk key")
+    trigger = parser.add_mutually_exclusive_group()
+    trigger.add_argument("--vad", dest="vad_mode", action="store_true", default=None,
+                         help="Hands-free mode (default when headless)")
+    trigger.add_argument("--push-to-talk", dest="vad_mode", action="store_false",
+                         help="Use the push-to-talk key (needs keyboard access)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = load_config(args.config)
+    # CLI flags override the config file
+    for key in ("server_url", "model_size", "device", "compute_type", "mic_index", "keybind", "vad_mode"):
+        value = getattr(args, key)
+        if value is not None:
+            config[key] = value
+
+    if args.headless:
+        if args.vad_mode is None:
+            config.setdefault("vad_mode", True)  # No keyboard hook on a headless box
+        run_headless(config)
+    else:
+        import tkinter as tk
+        from main import STTClientApp
+        root = tk.Tk()
+        STTClientApp(root, config, args.config)
+        root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# tests/test_hotkey.py
+"""Push-to-talk behaviour driven by synthetic key events through the fake keyboard backend."""
+import numpy as np
+from audio_capture import AudioCapture
+from fakes import FakeInputStream, FakeKeyListener
+from hotkey import HotkeyListener
+
+SAMPLE_RATE = 16000
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_listener(threshold=0.5, on_release=None):
+    hotkey = HotkeyListener(keybind="space", threshold=threshold, on_release=on_release,
+                            listener_factory=FakeKeyListener)
+    hotkey.clock = FakeClock()
+    hotkey.start()
+    return hotkey
+
+
+def hold(hotkey, seconds, key="space"):
+    hotkey.listener.press(key)
+    hotkey.clock.now += seconds
+    hotkey.listener.release(key)
+
+
+def test_long_press_is_accepted():
+    hotkey = make_listener()
+    hold(hotkey, 1.0)
+    duration, accepted, span, pressed_at = hotkey.wait_for_release(timeout=1)
+    assert accepted
+    assert duration == 1.0
+    assert pressed_at is not None
+
+
+def test_short_press_is_debounced():
+    hotkey = make_listener(threshold=0.5)
+    hold(hotkey, 0.2)
+    _, accepted, _, _ = hotkey.wait_for_release(timeout=1)
+    assert not accepted
+
+
+def test_key_repeat_and_other_keys_are_ignored():
+    hotkey = make_listener()
+    hotkey.listener.press("space")
+    hotkey.clock.now += 0.3
+    hotkey.listener.press("space")  # OS key repeat
+    hotkey.listener.press("a")
+    hotkey.listener.release("a")
+    hotkey.clock.now += 0.3
+    hotkey.listener.release("space")
+    duration, accepted, _, _ = hotkey.wait_for_release(timeout=1)
+    assert duration == 0.6 and accepted
+    assert hotkey.wait_for_release(timeout=0.05) is None
+
+
+def test_releases_queue_with_their_own_spans():
+    spans = iter([(0, 100), (200, 300), (400, 500)])
+    hotkey = make_listener(on_release=lambda duration, accepted: next(spans))
+    for _ in range(3):
+        hold(hotkey, 1.0)  # Nobody is waiting yet, like a pipeline blocked on a full queue
+    assert [hotkey.wait_for_release(timeout=1)[2] for _ in range(3)] == [(0, 100), (200, 300), (400, 500)]
+
+
+def test_stop_wakes_a_waiting_caller():
+    hotkey = make_listener()
+    hotkey.stop()
+    assert hotkey.wait_for_release(timeout=1) is None
+
+
+def test_capture_spans_follow_presses():
+    capture = AudioCapture(SAMPLE_RATE, pre_roll=0.0, max_utterance=10.0, stream_factory=FakeInputStream)
+    hotkey = HotkeyListener(on_press=capture.begin_utterance, on_release=capture.end_utterance,
+                            listener_factory=FakeKeyListener)
+    hotkey.clock = lambda: capture.frames_written / SAMPLE_RATE
+    capture.start()
+    hotkey.start()
+    stream = capture.stream
+
+    stream.feed(np.zeros(SAMPLE_RATE, dtype=np.float32), speed=0)
+    for level in (0.1, 0.2):
+        hotkey.listener.press("space")
+        stream.feed(np.full(SAMPLE_RATE, level, dtype=np.float32), speed=0)
+        hotkey.listener.release("space")
+        stream.feed(np.zeros(SAMPLE_RATE // 2, dtype=np.float32), speed=0)
+
+    for level in (0.1, 0.2):
+        _, accepted, (start, end), _ = hotkey.wait_for_release(timeout=1)
+        audio = capture.get_range(start, end)
+        assert accepted
+        assert len(audio) == SAMPLE_RATE
+        assert np.allclose(audio, level)
+
+
+def test_utterance_is_split_at_the_length_cap():
+    capture = AudioCapture(SAMPLE_RATE, pre_roll=0.0, max_utterance=1.0, stream_factory=FakeInputStream)
+    hotkey = HotkeyListener(threshold=0.5, on_press=capture.begin_utterance, on_release=capture.end_utterance,
+                            listener_factory=FakeKeyListener)
+    hotkey.clock = lambda: capture.frames_written / SAMPLE_RATE
+    hotkey.on_split = capture.split_utterance
+    capture.on_max_reached = hotkey.split
+    capture.start()
+    hotkey.start()
+
+    hotkey.listener.press("space")
+    capture.stream.feed(np.ones(int(SAMPLE_RATE * 1.3), dtype=np.float32), speed=0)
+    hotkey.listener.release("space")  # The 0.3 s tail is shorter than the threshold but still kept
+
+    releases = [hotkey.wait_for_release(timeout=1) for _ in range(2)]
+    assert [accepted for _, accepted, _, _ in releases] == [True, True]
+    assert [span for _, _, span, _ in releases] == [(0, SAMPLE_RATE), (SAMPLE_RATE, int(SAMPLE_RATE * 1.3))]
+
+    hotkey.listener.press("space")
+    capture.stream.feed(np.ones(SAMPLE_RATE // 10, dtype=np.float32), speed=0)
+    hotkey.listener.release("space")
+    assert not hotkey.wait_for_release(timeout=1)[1]  # A new press is debounced as usual
@@ -0,0 +1,109 @@
+# tests/test_outbox.py
+"""Outbox replay: messages sent while the server is down arrive, in order and unmerged, after it returns."""
+import queue
+import time
+import pytest
+import async_websocket_client
+import websocket_client
+from async_websocket_client import AsyncWebSocketClient
+from local_server import LocalServer
+from websocket_client import WebSocketClient
+
+
+@pytest.fixture(autouse=True)
+def fast_reconnect(monkeypatch):
+    for module in (websocket_client, async_websocket_client):
+        monkeypatch.setattr(module, "RECONNECT_BASE_DELAY", 0.1)
+        monkeypatch.setattr(module, "RECONNECT_MAX_DELAY", 0.5)
+
+
+def wait_until(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def collect(server, count, timeout=10.0):
+    received = []
+    deadline = time.monotonic() + timeout
+    while len(received) < count and time.monotonic() < deadline:
+        try:
+            _, event, data = server.received.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        received.append((event, data))
+    return received
+
+
+@pytest.mark.parametrize("client_class, port", [(WebSocketClient, 5091), (AsyncWebSocketClient, 5092)])
+def test_outbox_replays_across_server_restart(client_class, port):
+    server = LocalServer(port=port)
+    server.start()
+    client = client_class(lambda data: None, lambda message: None, server_url=server.url)
+    try:
+        client.connect_socket()
+        assert wait_until(lambda: client.is_connected)
+        client.send_message("before")
+        assert collect(server, 1) == [("stt_transcription", "before")]
+
+        server.stop()
+        assert wait_until(lambda: not client.is_connected)
+        messages = [f"while down {i}" for i in range(7)]  # Past BATCH_THRESHOLD, so the replay goes out in batches
+        for message in messages:
+            client.send_message(message)
+
+        server = LocalServer(port=port)
+        server.start()
+        assert wait_until(lambda: client.is_connected, timeout=15)
+        assert collect(server, len(messages)) == [("stt_transcription", message) for message in messages]
+        assert wait_until(lambda: client.backlog() == 0)
+    finally:
+        client.disconnect_socket()
+        server.stop()
+
+
+def test_backlog_is_batched_with_message_boundaries():
+    client = WebSocketClient(lambda data: None, lambda message: None, batch_threshold=5)
+    for i in range(3):
+        client.send_message(f"short {i}")
+    assert client.take_next() == ("stt_transcription", "short 0", ["short 0"])
+
+    client.send_event("stt_draft", {"utterance_id": 1, "text": "draft"})
+    for i in range(5):
+        client.send_message(f"late {i}")
+    event, payload, messages = client.take_next()
+    assert event == websocket_client.BATCH_EVENT
+    assert payload == messages == ["short 1", "short 2"]  # A structured event ends the batch
+    assert client.take_next()[0] == "stt_draft"
+    assert client.take_next()[1] == [f"late {i}" for i in range(5)]
+
+
+def test_spilled_messages_are_read_back_in_windows(tmp_path):
+    client = WebSocketClient(lambda data: None, lambda message: None, max_buffered=3,
+                             spill_file=str(tmp_path / "spill.jsonl"), batch_threshold=0)
+    messages = [f"message {i}" for i in range(10)]
+    for message in messages:
+        client.send_message(message)
+
+    sent = []
+    while client.backlog():
+        sent.extend(client.take_next()[2])
+        assert len(client.replay) <= 3 and len(client.outbox) <= 3
+    assert sent == messages
+    assert not (tmp_path / "spill.jsonl").exists()
+
+
+@pytest.mark.parametrize("ack_timeout, resent", [(60.0, 1), (0.0, 0)])
+def test_unacknowledged_payloads_expire(monkeypatch, ack_timeout, resent):
+    monkeypatch.setattr(websocket_client, "ACK_TIMEOUT", ack_timeout)
+    client = WebSocketClient(lambda data: None, lambda message: None, protocol="v1")
+    client.send_message("never acknowledged")
+    event, payload, messages = client.take_next()
+    client.prepare_emit(messages, payload)  # Emitted to a server that never calls the ack callback
+    time.sleep(0.01)
+    client.requeue_unacked()  # What a reconnect does
+    assert client.backlog() == resent
+    assert not client.unacked
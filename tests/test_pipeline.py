@@ -0,0 +1,62 @@
+# tests/test_pipeline.py
+"""STTPipeline shutdown: decodes that finish after stop() must not touch the torn-down pools."""
+import threading
+import numpy as np
+import pytest
+from pipeline import STTPipeline
+
+
+class SlowTranscriber:
+    """Just enough of WhisperTranscriber for the pipeline; each decode waits to be released."""
+
+    sample_rate = 16000
+    committed_text = ""
+    last_source = None
+    last_utterance_id = None
+    last_key_press = None
+
+    def __init__(self, draft_model_size=None):
+        self.draft_model_size = draft_model_size
+        self.decoding = threading.Semaphore(0)
+        self.release = threading.Event()
+
+    def transcribe_audio(self, audio, **kwargs):
+        self.decoding.release()
+        self.release.wait(5)
+        return "some text"
+
+
+def recordings(count):
+    """A record() that returns `count` utterances, then blocks like an idle hotkey."""
+    remaining = [count]
+    idle = threading.Event()
+
+    def record():
+        if remaining[0] == 0:
+            idle.wait()
+            return np.zeros(0, dtype=np.float32)
+        remaining[0] -= 1
+        return np.ones(1600, dtype=np.float32)
+    return record
+
+
+@pytest.fixture
+def thread_errors(monkeypatch):
+    errors = []
+    monkeypatch.setattr(threading, "excepthook", lambda args: errors.append(args.exc_value))
+    return errors
+
+
+@pytest.mark.parametrize("cascade, batch_size", [(True, 1), (False, 2)])
+def test_decode_finishing_after_stop(thread_errors, cascade, batch_size):
+    transcriber = SlowTranscriber(draft_model_size="tiny" if cascade else None)
+    pipeline = STTPipeline(transcriber, recordings(batch_size), lambda text, meta=None: None, lambda message: None,
+                           send_draft=lambda utterance_id, text: None, batch_size=batch_size)
+    pipeline.start()
+    assert transcriber.decoding.acquire(timeout=5)
+    decode_thread = pipeline.threads[1]
+    pipeline.stop()
+    transcriber.release.set()  # The draft (or batch) finishes after STT was stopped
+    decode_thread.join(5)
+    assert not decode_thread.is_alive()
+    assert thread_errors == []
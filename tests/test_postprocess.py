@@ -0,0 +1,47 @@
+# tests/test_postprocess.py
+"""PostProcessor: whole-word and phrase replacement in one pass, composable stages, large tables."""
+import json
+import pytest
+from transcriber import PostProcessor
+
+
+def test_default_stages_replace_whole_words_only():
+    postprocessor = PostProcessor()
+    assert postprocessor("What are you doing, whatever your okay?") == "Wat are u doing, whatever your oke?"
+
+
+def test_no_debug_output(capsys):
+    PostProcessor()("okay then")
+    assert capsys.readouterr().out == ""
+
+
+def test_phrases_prefer_the_longest_match():
+    postprocessor = PostProcessor({"you": "u", "see you": "cya", "see you later": "cu l8r"})
+    assert postprocessor("See you later, see you. You there?") == "Cu l8r, cya. u there?"  # Only the first letter is capitalized
+
+
+def test_phrases_do_not_match_across_punctuation():
+    postprocessor = PostProcessor({"see you": "cya"}, stages=("replace",))
+    assert postprocessor("I see. You know") == "I see. You know"
+
+
+def test_large_table_keeps_boundaries():
+    table = {f"word{i}": f"w{i}" for i in range(5000)}
+    table.update({"thank you": "ty", "you": "u"})
+    postprocessor = PostProcessor(table)
+    assert postprocessor("word42 word4200 word42x thank you, you") == "W42 w4200 word42x ty, u"
+
+
+def test_stages_compose_and_unknown_ones_are_rejected():
+    postprocessor = PostProcessor({"okay": "ok"}, stages=("lowercase", "replace", "strip_punctuation"))
+    assert postprocessor("Okay. Fine, OKAY!") == "ok fine ok"
+    with pytest.raises(ValueError):
+        PostProcessor(stages=("lowercase", "shout"))
+
+
+def test_loaded_dictionary_yields_to_config_entries(tmp_path):
+    path = tmp_path / "replacements.json"
+    path.write_text(json.dumps({"okay": "k", "by the way": "btw"}), encoding="utf-8")
+    postprocessor = PostProcessor({"okay": "oke"})
+    postprocessor.load_replacements(str(path))
+    assert postprocessor("okay, by the way") == "Oke, btw"
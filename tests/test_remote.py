@@ -0,0 +1,76 @@
+# tests/test_remote.py
+"""Remote mode on localhost: a TranscriptionServer with stub models decodes for RemoteModel clients."""
+import threading
+import time
+import numpy as np
+import pytest
+from async_websocket_client import AsyncWebSocketClient
+from fakes import StubModel
+from remote_model import RemoteModel
+from transcription_server import TranscriptionServer
+from websocket_client import WebSocketClient
+
+TEXTS = {"base": "main model words", "tiny": "draft words"}
+
+
+def wait_until(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+@pytest.fixture(params=[(WebSocketClient, 5093), (AsyncWebSocketClient, 5094)], ids=["threaded", "async"])
+def remote(request):
+    client_class, port = request.param
+    server = TranscriptionServer(port=port, model_size="base", extra_models=["tiny"], workers=2,
+                                 model_factory=lambda size, **kwargs: StubModel(TEXTS[size], rtf=0.2),
+                                 log=lambda message: None)
+    server.start()
+    clients = []
+
+    def connect():
+        client = client_class(lambda data: None, lambda message: None, server_url=server.url)
+        client.connect_socket()
+        assert wait_until(lambda: client.is_connected)
+        clients.append(client)
+        return client
+    yield connect
+    for client in clients:
+        client.disconnect_socket()
+    server.stop()
+
+
+def decode(model, seconds=1.0):
+    segments, info = model.transcribe(np.zeros(int(seconds * 16000), dtype=np.float32), beam_size=1)
+    return "".join(segment.text for segment in segments).strip()
+
+
+def test_main_and_draft_models_share_one_client(remote):
+    client = remote()
+    main, draft = RemoteModel("base", client=client), RemoteModel("tiny", client=client)
+    results = {}
+    threads = [threading.Thread(target=lambda name, model: results.update({name: decode(model)}), args=item)
+               for item in (("main", main), ("draft", draft))]
+    for thread in threads:
+        thread.start()  # In flight together, so each result must reach its own model
+    for thread in threads:
+        thread.join(10)
+    assert results == {"main": TEXTS["base"], "draft": TEXTS["tiny"]}
+
+
+def test_unknown_size_falls_back_to_the_main_model(remote):
+    assert decode(RemoteModel("large-v3", client=remote())) == TEXTS["base"]
+
+
+def test_only_final_transcriptions_reach_listeners(remote):
+    speaker, listener = remote(), remote()
+    updates = []
+    listener.on_message_callback = updates.append
+    decode(RemoteModel("base", client=speaker))
+    speaker.send_message("the final text")
+    assert wait_until(lambda: updates)
+    time.sleep(0.2)
+    assert updates == ["the final text"]  # The decode itself was not broadcast
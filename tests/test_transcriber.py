@@ -0,0 +1,49 @@
+# tests/test_transcriber.py
+"""Decoding with the stub model: confidence gating, and the decoding policy kept per input source."""
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from audio_capture import AudioCapture
+from fakes import FakeInputStream, StubModel
+from transcriber import DecodingPolicy, WhisperTranscriber
+
+SAMPLE_RATE = 16000
+
+
+def make_transcriber(model):
+    transcriber = WhisperTranscriber(sample_rate=SAMPLE_RATE,
+                                     capture=AudioCapture(SAMPLE_RATE, stream_factory=FakeInputStream))
+    transcriber.model = model
+    return transcriber
+
+
+def speech(seconds=1.0):
+    """A tone loud enough to pass the silence trim."""
+    return (0.3 * np.sin(2 * np.pi * 220 * np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE)).astype(np.float32)
+
+
+def test_confident_segment_is_kept():
+    transcriber = make_transcriber(StubModel(text="hello there", rtf=0))
+    assert transcriber.transcribe_audio(speech()) == "Hello there"
+
+
+@pytest.mark.parametrize("no_speech_prob, avg_logprob", [
+    (0.8, -0.3),  # Probably not speech, though fluent: faster-whisper keeps it
+    (0.1, -2.0),  # Speech, but barely recognised: faster-whisper keeps it too
+])
+def test_low_confidence_segment_is_dropped(no_speech_prob, avg_logprob):
+    model = StubModel(text="Thank you.", rtf=0, no_speech_prob=no_speech_prob, avg_logprob=avg_logprob)
+    transcriber = make_transcriber(model)
+    assert transcriber.transcribe_audio(speech()) == ""
+
+
+def test_context_and_language_lock_are_per_source():
+    policy = DecodingPolicy(lock_after=2, carry_context=True)
+    detected = SimpleNamespace(language="de", language_probability=0.99)
+    for _ in range(2):
+        options = policy.options(1.0, source="Alice")
+        policy.update(options, detected, 1.0, 0.1, "Guten Morgen", source="Alice")
+
+    alice, bob = policy.options(1.0, source="Alice"), policy.options(1.0, source="Bob")
+    assert (alice["language"], alice["initial_prompt"]) == ("de", "Guten Morgen")
+    assert (bob["language"], bob["initial_prompt"]) == (None, None)
@@ -0,0 +1,39 @@
+# tests/test_vad.py
+"""Energy VAD segmentation: the max_segment cap holds even inside one continuous run of speech."""
+import numpy as np
+from vad import VADSegmenter, segment_array
+
+SAMPLE_RATE = 16000
+
+
+def tone(seconds):
+    return (0.3 * np.sin(np.arange(int(seconds * SAMPLE_RATE)) * 0.1)).astype(np.float32)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+def test_continuous_speech_is_cut_at_max_segment():
+    audio = np.concatenate((silence(1), tone(5), silence(1)))
+    segments = segment_array(audio, SAMPLE_RATE, max_segment=2.0)
+    assert len(segments) == 3
+    assert all(end - start <= 2 * SAMPLE_RATE for start, end in segments)
+    # The pieces are contiguous: nothing is dropped or decoded twice
+    assert all(previous[1] == following[0] for previous, following in zip(segments, segments[1:]))
+
+
+def test_large_chunks_give_the_same_segments():
+    audio = np.concatenate((silence(1), tone(5), silence(1)))
+    segmenter = VADSegmenter(SAMPLE_RATE, max_segment=2.0)
+    segments = []
+    for start in range(0, len(audio), 3 * SAMPLE_RATE):  # Like a capture thread held up by backpressure
+        segments += segmenter.process(audio[start:start + 3 * SAMPLE_RATE])
+    segments += segmenter.flush()
+    assert segments == segment_array(audio, SAMPLE_RATE, max_segment=2.0)
+
+
+def test_short_tail_after_a_cut_is_kept():
+    audio = np.concatenate((silence(1), tone(2.1), silence(2)))
+    segments = segment_array(audio, SAMPLE_RATE, max_segment=2.0)
+    assert len(segments) == 2 and segments[0][1] == segments[1][0]
@@ -1,14 +1,16 @@
+import json
+import re
+import threading
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-import sounddevice as sd
-from scipy.io.wavfile import write
-import tempfile
 import os
-from faster_whisper import WhisperModel
-from pynput import keyboard
-
-# Threshold for key press time (in seconds)
-KEY_PRESS_THRESHOLD = 0.5  # Ignore key presses shorter than 0.5 seconds
+from model_manager import ModelManager
+from metrics import NULL_SPAN
+from audio_capture import AudioCapture, MultiCapture, DEFAULT_PRE_ROLL, DEFAULT_MAX_UTTERANCE
+from hotkey import HotkeyListener, KEY_PRESS_THRESHOLD
+from vad import VADSegmenter, find_split_points, find_speech_bounds
 
 # Word replacement dictionary
 WORD_REPLACEMENTS = {
@@ -17,147 +19,613 @@ WORD_REPLACEMENTS = {
     "okay": "oke",
 }
 
+# Post-processing stages applied to every transcript, in order
+DEFAULT_STAGES = ("lowercase", "replace", "capitalize")
+WORD_PATTERN = re.compile(r"\w+(?:'\w+)*")
+SENTENCE_PUNCTUATION = re.compile(r"[.!?,;:]+(?=\s|$)")
+
+
+class PostProcessor:
+    """Applies composable text stages; word replacements are a single pass over the text."""
+
+    def __init__(self, replacements=None, stages=DEFAULT_STAGES):
+        self.stage_functions = {
+            "lowercase": str.lower,
+            "replace": self.replace_words,
+            "strip_punctuation": self.strip_punctuation,
+            "capitalize": self.capitalize_first_letter,
+        }
+        unknown = [stage for stage in stages if stage not in self.stage_functions]
+        if unknown:
+            raise ValueError(f"Unknown post-processing stages: {', '.join(unknown)}")
+        self.stages = [self.stage_functions[stage] for stage in stages]
+        self.set_replacements(WORD_REPLACEMENTS if replacements is None else replacements)
+
+    def set_replacements(self, replacements):
+        """Index the replacement table by lowercased word sequence."""
+        self.replacements = {" ".join(key.lower().split()): value for key, value in replacements.items()}
+        self.max_words = max((key.count(" ") + 1 for key in self.replacements), default=0)
+
+    def load_replacements(self, file_path):
+        """Add replacements from a JSON file mapping words or phrases to their replacement."""
+        with open(file_path, "r", encoding="utf-8") as f:
+            table = json.load(f)
+        table.update(self.replacements)  # Entries from the config take priority
+        self.set_replacements(table)
+
+    def replace_words(self, text):
+        """Replace whole words (and phrases) from the table in one pass, whatever the table size."""
+        if not self.replacements:
+            return text
+        if self.max_words == 1:
+            return WORD_PATTERN.sub(lambda match: self.replacements.get(match.group(0).lower(), match.group(0)), text)
+
+        # Phrases: at each word, try the longest run of space-separated words first
+        words = list(WORD_PATTERN.finditer(text))
+        pieces = []
+        last_end = 0
+        i = 0
+        while i < len(words):
+            for n in range(min(self.max_words, len(words) - i), 0, -1):
+                run = words[i:i + n]
+                if any(text[a.end():b.start()].strip() for a, b in zip(run, run[1:])):
+                    continue
+                replacement = self.replacements.get(" ".join(word.group(0).lower() for word in run))
+                if replacement is not None:
+                    pieces.append(text[last_end:run[0].start()])
+                    pieces.append(replacement)
+                    last_end = run[-1].end()
+                    i += n
+                    break
+            else:
+                i += 1
+        pieces.append(text[last_end:])
+        return "".join(pieces)
+
+    def strip_punctuation(self, text):
+        """Drop sentence punctuation for a chat-like style."""
+        return SENTENCE_PUNCTUATION.sub("", text)
+
+    def capitalize_first_letter(self, text):
+        """Capitalize the first letter, ignoring leading whitespace."""
+        text = text.lstrip()
+        return text[:1].upper() + text[1:]
+
+    def __call__(self, text):
+        for stage in self.stages:
+            text = stage(text)
+        return " ".join(text.split())
+
+# Streaming partial transcription settings (in seconds)
+PARTIAL_INTERVAL = 0.5  # How often the growing buffer is re-decoded while the key is held
+PARTIAL_WINDOW = 15.0  # Uncommitted audio longer than this is force-committed
+PARTIAL_MIN_AUDIO = 1.0  # Don't bother decoding less audio than this
+
+
+class PartialTranscriber:
+    """Re-decodes the uncommitted tail of a growing utterance and locks in stable prefixes."""
+
+    def __init__(self, transcriber, window=PARTIAL_WINDOW):
+        self.transcriber = transcriber
+        self.capture = transcriber.capture
+        self.window_frames = int(window * transcriber.sample_rate)
+        self.min_frames = int(PARTIAL_MIN_AUDIO * transcriber.sample_rate)
+        self.reset()
+
+    def reset(self):
+        """Start tracking a new utterance."""
+        self.utterance_id = uuid.uuid4().hex
+        self.committed_words = []
+        self.commit_frame = self.capture.utterance_start  # Audio before this frame is never decoded again
+        self.previous_words = []
+
+    def committed_text(self):
+        return "".join(self.committed_words)
+
+    def update(self):
+        """Decode the uncommitted audio once; returns the current partial text or None."""
+        if self.commit_frame is None:
+            self.commit_frame = self.capture.utterance_start
+            if self.commit_frame is None:
+                return None
+        end = self.capture.frames_written
+        if end - self.commit_frame < self.min_frames:
+            return None
+        audio = self.capture.get_range(self.commit_frame, end)
+
+        segments, _ = self.transcriber.model.transcribe(
+            audio,
+            beam_size=1,
+            language=self.transcriber.policy.language_for(),  # Skip detection once the language is locked
+            word_timestamps=True,
+            condition_on_previous_text=False,
+            initial_prompt=self.committed_text() or None,
+        )
+        words = [word for segment in segments for word in (segment.words or [])]
+
+        # Words that agree with the previous pass are stable; keep the last one open in case it's cut off
+        stable = 0
+        while (stable < min(len(words), len(self.previous_words)) - 1 and
+               words[stable].word.strip().lower() == self.previous_words[stable].word.strip().lower()):
+            stable += 1
+        # Bound the decode cost: if the window is full, commit everything but the last two words
+        cutoff = None
+        if end - self.commit_frame > self.window_frames:
+            stable = max(stable, len(words) - 2)
+            if stable == 0:
+                # Too few words to commit (e.g. the key is held through silence): drop the audio before the
+                # window anyway, keeping the words that ended in it
+                cutoff = end - self.window_frames
+                sample_rate = self.transcriber.sample_rate
+                while stable < len(words) and self.commit_frame + int(words[stable].end * sample_rate) <= cutoff:
+                    stable += 1
+
+        if stable > 0:
+            self.committed_words.extend(word.word for word in words[:stable])
+            self.commit_frame += int(words[stable - 1].end * self.transcriber.sample_rate)
+            words = words[stable:]
+        if cutoff is not None:
+            self.commit_frame = max(self.commit_frame, cutoff)
+        self.previous_words = words
+
+        return self.committed_text() + "".join(word.word for word in words)
+
+
+# Long utterances are split at quiet points and the chunks decoded in parallel (in seconds)
+PARALLEL_MIN_DURATION = 30.0  # Shorter recordings are decoded in one pass
+PARALLEL_CHUNK = 15.0  # Target chunk length
+PARALLEL_OVERLAP = 0.5  # Audio shared by neighbouring chunks so no word is cut at a split
+
+
+# Decoding policy defaults
+LANGUAGE_LOCK_UTTERANCES = 3  # Consecutive confident detections of the same language before it is locked
+LANGUAGE_LOCK_PROBABILITY = 0.8  # Detections below this don't count towards the lock
+BEAM_SIZES = (5, 3, 1)  # Candidates, best first; the largest one expected to meet the latency target wins
+DEFAULT_TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)  # faster-whisper's fallback schedule
+CONTEXT_CHARS = 200  # Tail of the previous transcript carried forward as the prompt
+
+
+class DecodingPolicy:
+    """Chooses the decode options per utterance: sticky language, adaptive beam size and prompt carry-over.
+
+    The language lock and the carried context are kept per input source (speaker), so one speaker's
+    words never prompt, or pick the language for, another's; decode speed is shared, as is the model.
+    """
+
+    def __init__(self, language=None, lock_after=LANGUAGE_LOCK_UTTERANCES, lock_probability=LANGUAGE_LOCK_PROBABILITY,
+                 latency_target=None, carry_context=False):
+        self.language = language  # Fixed language for every source; None means detect until a source locks
+        self.lock_after = lock_after
+        self.lock_probability = lock_probability
+        self.latency_target = latency_target  # Seconds of decode time per utterance; None always uses the best beam
+        self.carry_context = carry_context
+        self.locked = {}  # source -> language locked from that source's own detections
+        self.candidates = {}  # source -> (language seen in the current run of confident detections, run length)
+        self.rtf = {}  # beam_size -> running decode time / audio duration
+        self.contexts = {}  # source -> tail of its last transcript
+        self.lock = threading.Lock()  # Batched decodes of several sources update the policy concurrently
+
+    def language_for(self, source=None):
+        """The language to decode `source` in, or None to detect it."""
+        return self.language or self.locked.get(source)
+
+    def beam_size(self, duration):
+        """Pick the largest beam whose expected decode time fits the latency target."""
+        if not self.latency_target:
+            return BEAM_SIZES[0]
+        rtf = None
+        for beam_size in BEAM_SIZES:
+            rtf = self.rtf.get(beam_size, rtf)  # Unmeasured beams are assumed as slow as the next larger one
+            if rtf is None or duration * rtf <= self.latency_target:
+                return beam_size
+        return BEAM_SIZES[-1]
+
+    def options(self, duration, prefix="", source=None):
+        """Return the keyword arguments for model.transcribe for an utterance of `duration` seconds from `source`."""
+        with self.lock:
+            beam_size = self.beam_size(duration)
+            language = self.language_for(source)
+            context = self.contexts.get(source, "") if self.carry_context else ""
+        return {
+            "beam_size": beam_size,
+            # Under a tight budget a temperature fallback would re-decode and blow it; accept the greedy result
+            "temperature": DEFAULT_TEMPERATURES if beam_size == BEAM_SIZES[0] else 0.0,
+            "language": language,
+            "initial_prompt": prefix or context or None,
+        }
+
+    def update(self, options, info, duration, decode_time, text, source=None):
+        """Learn from a finished decode of `source`: language detections, decode speed and the transcript."""
+        with self.lock:
+            if duration > 0:
+                rtf = decode_time / duration
+                previous = self.rtf.get(options["beam_size"])
+                self.rtf[options["beam_size"]] = rtf if previous is None else 0.8 * previous + 0.2 * rtf
+            if self.carry_context and text.strip():
+                self.contexts[source] = text.strip()[-CONTEXT_CHARS:]
+
+            if self.language_for(source) is not None or info is None:
+                return
+            candidate, streak = self.candidates.get(source, (None, 0))
+            if info.language_probability < self.lock_probability:
+                streak = 0
+            elif info.language == candidate:
+                streak += 1
+            else:
+                candidate, streak = info.language, 1
+            self.candidates[source] = candidate, streak
+            if self.lock_after and streak >= self.lock_after:
+                self.locked[source] = candidate
+                speaker = f" for {source}" if source is not None else ""
+                print(f"Language locked to '{candidate}'{speaker} after {streak} confident detections.")
+
+    def reset_context(self):
+        with self.lock:
+            self.contexts.clear()
+
+
+# Confidence gating. faster-whisper already skips a segment only when no_speech_prob > 0.6 *and*
+# avg_logprob < -1.0; hallucinations like "Thank you." usually fail just one of the two, so each is
+# checked on its own here
+NO_SPEECH_THRESHOLD = 0.6  # Dropped above this no-speech probability, however confident the text
+LOGPROB_THRESHOLD = -1.5  # Dropped below this average log-probability (after temperature fallback)
+
+
+def same_transcript(first, second):
+    """True if two transcripts only differ in case, punctuation and spacing."""
+    return WORD_PATTERN.findall(first.lower()) == WORD_PATTERN.findall(second.lower())
+
+
 class WhisperTranscriber:
-    def __init__(self, model_size="medium", sample_rate=16000):
+    def __init__(self, model_size="medium", sample_rate=16000, pre_roll=DEFAULT_PRE_ROLL,
+                 max_utterance=DEFAULT_MAX_UTTERANCE, capture=None, dump_dir=None,
+                 on_partial=None, partial_interval=PARTIAL_INTERVAL, vad_settings=None, models=None,
+                 postprocessor=None, parallel_workers=1, trim_silence=True,
+                 no_speech_threshold=NO_SPEECH_THRESHOLD, logprob_threshold=LOGPROB_THRESHOLD, policy=None,
+                 draft_model_size=None, sources=None):
         self.model_size = model_size
         self.sample_rate = sample_rate
-        self.model = None  # Model will be loaded on demand
-        self.is_recording = False
-        self.listener = None
-        self.press_start_time = None  # Time when the key was pressed
-        self.recording_in_progress = False  # Flag to prevent multiple recordings
-        self.ignore_recording = False  # Flag to ignore recordings with short key presses
+        self.capture = capture or AudioCapture(sample_rate, pre_roll=pre_roll, max_utterance=max_utterance)
+        self.models = models or ModelManager()  # Shared cache, so toggling STT doesn't reload
+        self.model = None  # Acquired from the manager on demand
+        self.dump_dir = dump_dir  # When set, every utterance is also written here as a WAV for debugging
+        self.dump_count = 0
+        self.postprocessor = postprocessor or PostProcessor()
+        self.hotkey = HotkeyListener(threshold=KEY_PRESS_THRESHOLD, on_press=self.capture.begin_utterance,
+                                     on_release=self.capture.end_utterance)
+        # An utterance held past max_utterance is split at the cap rather than cut off
+        self.hotkey.on_split = self.capture.split_utterance
+        self.capture.on_max_reached = self.hotkey.split
+
+        # Streaming partials are enabled by passing on_partial(utterance_id, text)
+        self.on_partial = on_partial
+        self.partial_interval = partial_interval
+        self.partials = PartialTranscriber(self)
+        self.committed_text = ""  # Text already locked in for the last recorded utterance
+        self.last_key_press = None  # perf_counter time the last push-to-talk utterance started
+        self.last_utterance_id = None  # ID the last recording's partials were sent under, if any
+
+        # Hands-free mode: segments are cut from the continuous stream by the VAD
+        self.vad = VADSegmenter(sample_rate, max_segment=max_utterance, **(vad_settings or {}))
+        self.vad_position = None  # Next absolute capture frame the VAD hasn't seen
+        self.vad_pending = []  # Closed segments waiting to be handed out
+
+        # Multi-source capture: every input device or channel is segmented by its own VAD
+        self.sources = MultiCapture(sources, sample_rate, pre_roll=pre_roll, max_utterance=max_utterance) \
+            if sources else None
+        self.source_vads = {label: VADSegmenter(sample_rate, max_segment=max_utterance, **(vad_settings or {}))
+                            for label in (self.sources.captures if self.sources else ())}
+        self.source_positions = {}  # label -> next frame of that source the VAD hasn't seen
+        self.source_pending = []  # (label, start, end) of closed segments waiting to be handed out
+        self.last_source = None  # Label of the source the last recording came from
+
+        # Parallel decoding of long utterances; the model must be loaded with num_workers >= parallel_workers
+        self.parallel_workers = parallel_workers
+        self.decode_pool = None
+
+        # Energy pre-pass and confidence gating, so silence never reaches (or leaks out of) the decoder
+        self.trim_silence = trim_silence
+        self.no_speech_threshold = no_speech_threshold
+        self.logprob_threshold = logprob_threshold
+        self.rtf_estimate = None  # Running decode time / audio duration, to estimate the time saved
+
+        # Language, beam size, temperature fallback and prompt for each decode
+        self.policy = policy or DecodingPolicy()
+
+        # Cascade mode: a small model drafts every utterance, the main model corrects it in the background
+        self.draft_model_size = draft_model_size
+        self.draft_model = None
+
+    def preload_model(self):
+        """Start loading the Whisper model(s) in the background."""
+        if self.draft_model_size:
+            self.models.preload(self.draft_model_size)
+        self.models.preload(self.model_size)
 
     def load_model(self):
-        """Load the Whisper model."""
+        """Get the Whisper model(s), waiting for them to load if they aren't cached yet."""
+        if self.draft_model_size and self.draft_model is None:
+            self.draft_model = self.models.get(self.draft_model_size)
         if self.model is None:
-            self.model = WhisperModel(self.model_size, device="cuda", compute_type="float32")
-            print("Whisper model loaded.")
+            self.model = self.models.get(self.model_size)
 
     def unload_model(self):
-        """Unload the Whisper model."""
+        """Release the Whisper model(s); the manager keeps them cached until they have been idle for a while."""
+        if self.draft_model is not None:
+            self.draft_model = None
+            self.models.release(self.draft_model_size)
         if self.model is not None:
             self.model = None
-            print("Whisper model unloaded.")
-
-    def on_press(self, key):
-        """Handle key press events."""
-        try:
-            if str(key.char) == self.keybind:
-                if not self.is_recording and not self.recording_in_progress:
-                    self.press_start_time = time.time()  # Record the start time of the press
-                    self.is_recording = True
-                    self.recording_in_progress = True  # Set flag to prevent multiple recordings
-                    self.ignore_recording = False  # Reset ignore flag
-                    print("Recording started")
-        except AttributeError:
-            # Handle special keys like space, ctrl, etc.
-            if str(key) == self.keybind:
-                if not self.is_recording and not self.recording_in_progress:
-                    self.press_start_time = time.time()  # Record the start time of the press
-                    self.is_recording = True
-                    self.recording_in_progress = True  # Set flag to prevent multiple recordings
-                    self.ignore_recording = False  # Reset ignore flag
-                    print("Recording started")
-
-    def on_release(self, key):
-        """Handle key release events."""
-        try:
-            if str(key.char) == self.keybind and self.press_start_time:
-                press_duration = time.time() - self.press_start_time
-                if press_duration < KEY_PRESS_THRESHOLD:
-                    print(f"Key {key.char} pressed too quickly ({press_duration:.2f}s). Ignoring.")
-                    self.ignore_recording = True  # Set flag to ignore this recording
-                self.is_recording = False
-                self.recording_in_progress = False  # Reset flag
-                return False
-        except AttributeError:
-            if str(key) == self.keybind and self.press_start_time:
-                press_duration = time.time() - self.press_start_time
-                if press_duration < KEY_PRESS_THRESHOLD:
-                    print(f"Key {key} pressed too quickly ({press_duration:.2f}s). Ignoring.")
-                    self.ignore_recording = True  # Set flag to ignore this recording
-                self.is_recording = False
-                self.recording_in_progress = False  # Reset flag
-                return False
+            self.models.release(self.model_size)
 
     def set_keybind(self, keybind):
         """Set the keybind for starting/stopping recording."""
-        self.keybind = keybind
+        self.hotkey.set_keybind(keybind)
+
+    def stop_listening(self):
+        """Stop capture and the hotkey listener, waking up a blocked record_audio call."""
+        self.hotkey.stop()
+        self.capture.stop()
+        self.vad_position = None
+        self.vad_pending = []
+        if self.sources:
+            self.sources.stop()
+            self.source_positions = {}
+            self.source_pending = []
+        self.policy.reset_context()
 
     def record_audio(self):
-        """Record audio while the keybind is pressed."""
-        print("Recording audio...")
-        recording = np.array([], dtype='float32').reshape(0, 1)
-        frames_per_buffer = int(self.sample_rate * 0.1)
-
-        with keyboard.Listener(on_press=self.on_press, on_release=self.on_release) as listener:
-            self.listener = listener
-            while True:
-                if self.is_recording:
-                    chunk = sd.rec(frames_per_buffer, samplerate=self.sample_rate, channels=1, dtype='float32')
-                    sd.wait()
-                    recording = np.vstack([recording, chunk])
-                if not self.is_recording and len(recording) > 0:
-                    break
-            listener.join()
+        """Block until the keybind is pressed and released, then return the captured audio."""
+        self.capture.start()
+        self.hotkey.start()
+        self.committed_text = ""
+        self.last_utterance_id = None
 
-        print(f"Recorded {len(recording)} frames.")
+        if self.on_partial:
+            result = self.record_with_partials()
+            from_frame = self.partials.commit_frame
+            self.last_utterance_id = self.partials.utterance_id
+        else:
+            result = self.hotkey.wait_for_release()
+            from_frame = None
 
-        # If the recording should be ignored, return an empty array
-        if self.ignore_recording:
+        # Listener was stopped, or the press was too short
+        if result is None or result[2] is None:
+            return np.array([], dtype='float32')
+        duration, accepted, (start, end), self.last_key_press = result
+        if from_frame is not None and start <= from_frame <= end:
+            start = from_frame  # Audio before this is already in committed_text
+        else:
+            self.committed_text = ""  # The partials were tracking a later press
+        recording = self.capture.get_range(start, end)
+        print(f"Recorded {len(recording)} frames.")
+        if not accepted:
             print("Ignoring recording due to short key press.")
-            return np.array([], dtype='float32').reshape(0, 1)
+            return np.array([], dtype='float32')
 
         return recording
 
-    def replace_words(self, text):
-        """Replace specific words in the text based on the replacement dictionary."""
-        for word, replacement in WORD_REPLACEMENTS.items():
-            text = text.replace(word, replacement)
-        return text
+    def record_vad_segment(self):
+        """Block until the VAD closes a speech segment in the continuous stream, then return its audio."""
+        self.capture.start()
+        self.committed_text = ""
+        self.last_key_press = None
+        self.last_utterance_id = None
+        if self.vad_position is None:
+            self.vad_position = self.capture.frames_written
+            self.vad.reset(self.vad_position)
 
-    def capitalize_first_letter(self, text):
-        print("Original:", text)
-        print("ASCII Codes:", [ord(c) for c in text])  # Debug each character
-    
-        text = text.lstrip()  # Remove leading spaces
-    
-        if len(text) > 0:
-            capitalized = text[0].upper() + text[1:]
-            print("Modified:", capitalized)
-            return capitalized
-        return text
+        while not self.vad_pending:
+            position = self.capture.wait_for_frames(self.vad_position, timeout=0.5)
+            if self.capture.stream is None:
+                return np.array([], dtype='float32')  # Capture was stopped
+            if position > self.vad_position:
+                self.vad_pending.extend(self.vad.process(self.capture.get_range(self.vad_position, position)))
+                self.vad_position = position
+
+        start, end = self.vad_pending.pop(0)
+        recording = self.capture.get_range(start, end)
+        print(f"VAD segment of {len(recording)} frames.")
+        return recording
+
+    def record_sources(self):
+        """Block until the VAD of any input source closes a speech segment, then return its audio.
+
+        The segment's source label is left in last_source.
+        """
+        self.sources.start()
+        self.committed_text = ""
+        self.last_key_press = None
+        self.last_utterance_id = None
+        if not self.source_positions:
+            for label, capture in self.sources.captures.items():
+                self.source_positions[label] = capture.frames_written
+                self.source_vads[label].reset(capture.frames_written)
+
+        while not self.source_pending:
+            self.sources.wait(timeout=0.5)
+            if not self.sources.running:
+                return np.array([], dtype='float32')  # Capture was stopped
+            for label, capture in self.sources.captures.items():
+                position = capture.frames_written
+                if position > self.source_positions[label]:
+                    segments = self.source_vads[label].process(capture.get_range(self.source_positions[label],
+                                                                                 position))
+                    self.source_pending.extend((label, start, end) for start, end in segments)
+                    self.source_positions[label] = position
 
+        label, start, end = self.source_pending.pop(0)
+        self.last_source = label
+        recording = self.sources.captures[label].get_range(start, end)
+        print(f"VAD segment of {len(recording)} frames from {label}.")
+        return recording
+
+    def record_with_partials(self):
+        """Wait for the key release while emitting partial transcriptions of the growing buffer."""
+        self.partials.reset()
+        while True:
+            result = self.hotkey.wait_for_release(timeout=self.partial_interval)
+            if result is not None or self.hotkey.listener is None:
+                break
+            if not self.hotkey.pressed.is_set():
+                self.partials.reset()  # Nothing is being recorded yet
+                continue
+            partial = self.partials.update()
+            if partial:
+                self.on_partial(self.partials.utterance_id, self.postprocess(partial))
+        if result is not None and result[1]:
+            self.committed_text = self.partials.committed_text()
+        return result
+
+    def dump_utterance(self, recording):
+        """Write an utterance to the dump directory as a WAV file (debug only)."""
+        from scipy.io.wavfile import write  # Only needed when dumping is enabled
 
+        os.makedirs(self.dump_dir, exist_ok=True)
+        self.dump_count += 1
+        file_path = os.path.join(self.dump_dir, f"utterance_{int(time.time())}_{self.dump_count:04d}.wav")
+        write(file_path, self.sample_rate, recording)
+        print(f"Dumped utterance to {file_path}")
 
-    def save_temp_audio(self, recording):
-        """Save recorded audio to a temporary file and transcribe it."""
+    def transcribe_audio(self, recording, prefix="", span=NULL_SPAN, draft=False, details=None, on_segment=None,
+                         source=None):
+        """Transcribe a float32 mono recording directly from memory, appending it to an already committed prefix.
+
+        With draft=True the small cascade model decodes greedily, leaving the policy's statistics alone.
+        A `details` dict is filled with the language and, for single-pass decodes, a 0-1 confidence.
+        on_segment(index, text) receives each post-processed segment as soon as the model yields it
+        (the committed prefix first); the full transcription is still returned at the end. `source` is
+        the input source label, whose own language lock and context the policy applies.
+        """
+        next_index = 0
+        if on_segment and prefix.strip():
+            on_segment(0, self.postprocess(prefix))
+            next_index = 1
         if len(recording) == 0:
-            return ""  # Return empty string if recording is ignored
+            return self.postprocess(prefix) if prefix.strip() else ""  # Return empty string if recording is ignored
+        span.mark("decode_start")
+        span.set("audio_duration", len(recording) / self.sample_rate)
+
+        # No-op for the contiguous float32 views handed over by AudioCapture
+        audio = np.ascontiguousarray(recording, dtype=np.float32).reshape(-1)
+
+        if self.dump_dir and not draft:
+            self.dump_utterance(audio)
+
+        if self.trim_silence:
+            audio = self.trim_audio(audio, span)
+            if audio is None:
+                span.mark("decode_end")
+                return self.postprocess(prefix) if prefix.strip() else ""
+        duration = len(audio) / self.sample_rate
+        options = self.policy.options(duration, prefix, source)
+        if draft:
+            options.update(beam_size=1, temperature=0.0)
+        span.set("beam_size", options["beam_size"])
+        decode_start = time.perf_counter()
+
+        if self.parallel_workers > 1 and duration > PARALLEL_MIN_DURATION and not draft:
+            text, info = self.transcribe_parallel(audio, options, on_segment, next_index)
+        else:
+            model = self.draft_model if draft else self.model
+            segments, info = model.transcribe(audio, **options)
+            text = ""
+            logprobs = []
+            for segment in segments:  # Lazy: each segment is decoded as the loop asks for it
+                if self.keep_segment(segment):
+                    text += segment.text + " "
+                    logprobs.append(getattr(segment, "avg_logprob", 0.0))
+                    if on_segment and segment.text.strip():
+                        on_segment(next_index, self.postprocess(segment.text))
+                        next_index += 1
+            if details is not None and logprobs:
+                details["confidence"] = round(float(np.exp(np.mean(logprobs))), 4)
+        if options["language"] is None:
+            print("Detected language '%s' with probability %f" % (info.language, info.language_probability))
+        full_transcription = prefix + text
+        if details is not None:
+            details["language"] = info.language
+
+        decode_time = time.perf_counter() - decode_start
+        if not draft:
+            self.policy.update(options, info if options["language"] is None else None, duration, decode_time,
+                               full_transcription, source)
+            with self.policy.lock:
+                self.rtf_estimate = decode_time / duration if self.rtf_estimate is None else \
+                    0.8 * self.rtf_estimate + 0.2 * decode_time / duration
+        span.mark("decode_end")
+        print("Draft complete." if draft else "Transcription complete.")
 
-        print("Saving temp audio file for transcription...")
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_wav:
-            write(temp_wav.name, self.sample_rate, recording)  # Save recording as WAV
-            file_path = temp_wav.name  # Get file path
+        span.mark("postprocess_start")
+        full_transcription = self.postprocess(full_transcription)
+        span.mark("postprocess_end")
+        return full_transcription
 
-        segments, info = self.model.transcribe(file_path, beam_size=5)
-        print("Detected language '%s' with probability %f" % (info.language, info.language_probability))
+    def trim_audio(self, audio, span=NULL_SPAN):
+        """Cut silent edges off a recording; returns None if it holds no speech at all."""
+        bounds = find_speech_bounds(audio, self.sample_rate, self.vad.threshold_db,
+                                    self.vad.min_speech / self.sample_rate, self.vad.padding / self.sample_rate)
+        trimmed = len(audio) if bounds is None else len(audio) - (bounds[1] - bounds[0])
+        if trimmed:
+            seconds = trimmed / self.sample_rate
+            saved = seconds * (self.rtf_estimate or 0.0)
+            span.set("trimmed_seconds", round(seconds, 3))
+            span.set("saved_decode_seconds", round(saved, 4))
+            if bounds is None:
+                print(f"No speech detected, skipped decoding {seconds:.2f}s of audio (saved ~{saved:.2f}s).")
+            else:
+                print(f"Trimmed {seconds:.2f}s of silence (saved ~{saved:.2f}s of decode).")
+        if bounds is None:
+            return None
+        return audio[bounds[0]:bounds[1]]
 
-        full_transcription = ""
-        for segment in segments:
-            full_transcription += segment.text + " "
+    def keep_segment(self, segment):
+        """Drop segments that are probably not speech or barely recognised (typical 'Thank you.' hallucinations)."""
+        no_speech_prob = getattr(segment, "no_speech_prob", 0.0)
+        avg_logprob = getattr(segment, "avg_logprob", 0.0)
+        if no_speech_prob > self.no_speech_threshold or avg_logprob < self.logprob_threshold:
+            print(f"Dropped low-confidence segment: {segment.text!r}")
+            return False
+        return True
 
-        os.remove(file_path)  # Delete temp file after transcription
-        print("Transcription complete.")
+    def transcribe_parallel(self, audio, options, on_segment=None, first_index=0):
+        """Split a long recording at quiet points, decode the chunks concurrently and stitch them in order.
 
-        # Normalize text to lowercase
-        full_transcription = full_transcription.lower()
+        Returns the text and the first chunk's info (the one that saw the prompt). With on_segment,
+        each chunk's text is handed over as soon as it and all chunks before it are done.
+        """
+        bounds = [0] + find_split_points(audio, self.sample_rate, PARALLEL_CHUNK) + [len(audio)]
+        overlap = int(PARALLEL_OVERLAP * self.sample_rate)
+        if self.decode_pool is None:
+            self.decode_pool = ThreadPoolExecutor(max_workers=self.parallel_workers)
 
-        # Replace words
-        full_transcription = self.replace_words(full_transcription)
+        def decode_chunk(i):
+            start = max(0, bounds[i] - overlap)
+            end = min(len(audio), bounds[i + 1] + overlap)
+            chunk_options = dict(options, initial_prompt=options["initial_prompt"] if i == 0 else None)
+            segments, info = self.model.transcribe(audio[start:end], word_timestamps=True, **chunk_options)
+            # De-duplicate the overlap: a word belongs to the chunk that contains its midpoint
+            words = []
+            for segment in segments:
+                if not self.keep_segment(segment):
+                    continue
+                for word in segment.words or []:
+                    midpoint = start + (word.start + word.end) / 2 * self.sample_rate
+                    if bounds[i] <= midpoint < bounds[i + 1]:
+                        words.append(word.word)
+            return "".join(words), info
 
-        # Capitalize the first letter
-        full_transcription = self.capitalize_first_letter(full_transcription)
+        start = time.perf_counter()
+        results = []
+        for chunk_text, info in self.decode_pool.map(decode_chunk, range(len(bounds) - 1)):
+            results.append((chunk_text, info))
+            if on_segment and chunk_text.strip():
+                on_segment(first_index, self.postprocess(chunk_text))
+                first_index += 1
+        print(f"Decoded {len(audio) / self.sample_rate:.1f}s in {len(bounds) - 1} parallel chunks "
+              f"in {time.perf_counter() - start:.2f}s.")
+        return "".join(text for text, _ in results), results[0][1]
 
-        return full_transcription
\ No newline at end of file
+    def postprocess(self, full_transcription):
+        """Apply the configured post-processing stages to a raw transcript."""
+        return self.postprocessor(full_transcription)
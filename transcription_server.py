@@ -0,0 +1,146 @@
+# transcription_server.py
+import argparse
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from local_server import LocalServer
+from model_process import to_plain
+from websocket_client import BATCH_EVENT
+
+# Decode batching
+BATCH_WINDOW = 0.05  # After the first utterance arrives, wait this long for others to share the batch (in seconds)
+
+# Options clients may pass through to model.transcribe
+ALLOWED_OPTIONS = ("beam_size", "temperature", "language", "initial_prompt", "word_timestamps",
+                   "condition_on_previous_text")
+
+
+class TranscriptionServer(LocalServer):
+    """Companion server for remote transcription: clients stream int16 PCM, one shared model decodes it.
+
+    Utterances finishing within BATCH_WINDOW of each other are decoded together, one per model worker.
+    The segments go back to the sending client only, as stt_remote_result; a decode may be a partial,
+    draft or chunk. Listeners get the client's final, post-processed stt_transcription, rebroadcast
+    as stt_transcription_update.
+    """
+
+    def __init__(self, host="127.0.0.1", port=5056, model_size="base", device="auto", compute_type="auto",
+                 workers=2, batch_window=BATCH_WINDOW, model=None, log=print, extra_models=(), model_factory=None):
+        super().__init__(host, port, record=False)  # A long-running server must not keep every message
+        self.model_size = model_size
+        self.device = device
+        self.compute_type = compute_type
+        self.workers = workers
+        self.batch_window = batch_window
+        self.model = model  # Loaded in start() unless given (e.g. a StubModel)
+        self.extra_models = tuple(extra_models)  # Other sizes clients may ask for, e.g. cascade draft models
+        self.model_factory = model_factory  # WhisperModel if None
+        self.models = {}  # Loaded extra models by size
+        self.log = log
+        self.buffers = {}  # (sid, utterance_id) -> bytearray of PCM received so far
+        self.lock = threading.Lock()
+        self.jobs = queue.Queue()
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.sio.on("stt_audio_chunk", self.on_audio_chunk)
+        self.sio.on("stt_audio_end", self.on_audio_end)
+        self.sio.on("stt_transcription", self.on_transcription)
+        self.sio.on(BATCH_EVENT, self.on_transcription_batch)
+
+    def on_disconnect(self, sid, *args):
+        super().on_disconnect(sid)
+        with self.lock:
+            for key in [key for key in self.buffers if key[0] == sid]:
+                del self.buffers[key]
+
+    def on_transcription(self, sid, data):
+        """Relay a client's final transcription to all listeners."""
+        self.sio.emit("stt_transcription_update", data)
+
+    def on_transcription_batch(self, sid, data):
+        """Relay each transcription of a client's replayed backlog as its own update."""
+        for item in data if isinstance(data, list) else [data]:
+            self.sio.emit("stt_transcription_update", item)
+
+    def on_audio_chunk(self, sid, data):
+        """Append a PCM chunk; socket.io delivers a client's events in order."""
+        with self.lock:
+            self.buffers.setdefault((sid, data["utterance_id"]), bytearray()).extend(data["pcm"])
+
+    def on_audio_end(self, sid, data):
+        """Queue a complete utterance for decoding."""
+        with self.lock:
+            pcm = self.buffers.pop((sid, data["utterance_id"]), bytearray())
+        options = data.get("options") or {}
+        model = self.models.get(options.get("model_size"), self.model)  # Unknown sizes get the main model
+        options = {key: value for key, value in options.items() if key in ALLOWED_OPTIONS}
+        self.jobs.put((sid, data["utterance_id"], pcm, options, model, time.perf_counter()))
+
+    def start(self):
+        if self.model is None or self.extra_models:
+            from model_manager import ModelManager
+            manager = ModelManager(device=self.device, compute_type=self.compute_type, num_workers=self.workers,
+                                   idle_timeout=0, log=self.log, model_factory=self.model_factory)
+            if self.model is None:
+                self.model = manager.get(self.model_size)
+            for model_size in self.extra_models:
+                self.models[model_size] = manager.get(model_size)
+        threading.Thread(target=self.batch_loop, daemon=True).start()
+        super().start()
+
+    def batch_loop(self):
+        """Collect utterances that finish close together and decode them concurrently on the shared model."""
+        while True:
+            batch = [self.jobs.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.workers:
+                try:
+                    batch.append(self.jobs.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            start = time.perf_counter()
+            list(self.pool.map(self.decode, batch))
+            if len(batch) > 1:
+                self.log(f"Decoded a batch of {len(batch)} utterances in {time.perf_counter() - start:.2f}s")
+
+    def decode(self, job):
+        sid, utterance_id, pcm, options, model, received_at = job
+        audio = np.frombuffer(bytes(pcm), dtype=np.int16).astype(np.float32) / 32768.0
+        try:
+            segments, info = model.transcribe(audio, **options)
+            segments = [to_plain(segment) for segment in segments]
+        except Exception as e:
+            self.log(f"Decode failed for {sid}: {e}")
+            self.sio.emit("stt_remote_result", {"utterance_id": utterance_id, "error": repr(e)}, to=sid)
+            return
+        self.sio.emit("stt_remote_result", {
+            "utterance_id": utterance_id,
+            "segments": segments,
+            "info": {"language": info.language, "language_probability": info.language_probability,
+                     "duration": info.duration},
+        }, to=sid)
+        text = "".join(segment["text"] for segment in segments).strip()
+        self.log(f"{sid}: {len(audio) / 16000:.2f}s decoded in {time.perf_counter() - received_at:.2f}s: {text}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared transcription server for remote-mode STT clients")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on (0.0.0.0 for the whole team)")
+    parser.add_argument("--port", type=int, default=5056, help="Port to listen on")
+    parser.add_argument("--model", default="base", help="Whisper model size")
+    parser.add_argument("--device", default="auto", help="Inference device: auto, cpu or cuda")
+    parser.add_argument("--compute-type", default="auto", help="CTranslate2 compute type (e.g. int8, float16)")
+    parser.add_argument("--workers", type=int, default=2, help="Utterances decoded concurrently")
+    parser.add_argument("--extra-models", default="",
+                        help="Comma-separated smaller models clients may request, e.g. 'tiny' for cascade drafts")
+    args = parser.parse_args()
+
+    server = TranscriptionServer(args.host, args.port, args.model, args.device, args.compute_type, args.workers,
+                                 extra_models=[size for size in args.extra_models.split(",") if size])
+    server.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
@@ -1,7 +1,13 @@
 # ui.py
+import collections
 import tkinter as tk
 from tkinter import simpledialog, ttk
-import sounddevice as sd
+
+# Log area limits
+LOG_MAX_LINES = 500  # Oldest lines are dropped beyond this
+LOG_FLUSH_INTERVAL = 100  # How often queued messages are written to the widget (in ms)
+LOG_MAX_PER_FLUSH = 50  # Messages written per flush; the rest wait for the next one
+LOG_QUEUE_SIZE = 1000  # Messages waiting beyond this are dropped, oldest first
 
 class STTClientUI:
     def __init__(self, root, config, on_send_text, on_try_connect_again, on_change_keybind, on_toggle_stt):
@@ -15,8 +21,13 @@ class STTClientUI:
         self.on_change_keybind = on_change_keybind
         self.on_toggle_stt = on_toggle_stt
 
+        # Log messages can come from any thread; they are written to the widget on the Tk thread
+        self.log_queue = collections.deque(maxlen=LOG_QUEUE_SIZE)
+        self.log_dropped = 0
+
         # UI Elements
         self.create_ui()
+        self.root.after(LOG_FLUSH_INTERVAL, self.flush_log)
 
     def create_ui(self):
         """Create and organize the UI elements."""
@@ -43,6 +54,7 @@ class STTClientUI:
         self.mic_label = ttk.Label(self.main_frame, text="Select Microphone:")
         self.mic_label.grid(row=4, column=0, sticky=tk.W, pady=(0, 5))
 
+        import sounddevice as sd  # Deferred until the window is actually built
         self.mic_list = [f"{i}: {device['name']}" for i, device in enumerate(sd.query_devices())]
         self.selected_mic = tk.StringVar()
         self.selected_mic.set(self.mic_list[self.config.get("mic_index", 0)])  # Default to saved mic
@@ -50,6 +62,16 @@ class STTClientUI:
         self.mic_dropdown = ttk.Combobox(self.main_frame, textvariable=self.selected_mic, values=self.mic_list, state="readonly")
         self.mic_dropdown.grid(row=5, column=0, columnspan=2, pady=(0, 10))
 
+        # Several simultaneous inputs are set in the config's input_sources; the dropdown doesn't apply then
+        sources = self.config.get("input_sources")
+        if sources:
+            self.mic_label.config(text="Input Sources:")
+            self.selected_mic.set(", ".join(
+                f"{source.get('label') or f'source {i + 1}'} ({source.get('device', 'default')}"
+                f"{':' + str(source['channel']) if source.get('channel') else ''})"
+                for i, source in enumerate(sources)))
+            self.mic_dropdown.config(state="disabled")
+
         # Keybind Selection
         self.keybind_label = ttk.Label(self.main_frame, text=f"Current Keybind: {self.config.get('keybind', 'space')}")
         self.keybind_label.grid(row=6, column=0, sticky=tk.W, pady=(0, 5))
@@ -72,8 +94,26 @@ class STTClientUI:
         self.scrollbar.grid(row=9, column=2, sticky=tk.NS)
 
     def log(self, message):
-        """Log messages in UI."""
-        self.log_area.config(state=tk.NORMAL)
-        self.log_area.insert(tk.END, message + "\n")
-        self.log_area.config(state=tk.DISABLED)
-        self.log_area.yview(tk.END)
\ No newline at end of file
+        """Queue a message for the log area; safe to call from any thread."""
+        if len(self.log_queue) == LOG_QUEUE_SIZE:
+            self.log_dropped += 1
+        self.log_queue.append(message)
+
+    def flush_log(self):
+        """Write queued log messages to the widget in one batch and trim it to LOG_MAX_LINES."""
+        lines = []
+        if self.log_dropped:
+            lines.append(f"[{self.log_dropped} log messages dropped]")
+            self.log_dropped = 0
+        while self.log_queue and len(lines) < LOG_MAX_PER_FLUSH:
+            lines.append(self.log_queue.popleft())
+
+        if lines:
+            self.log_area.config(state=tk.NORMAL)
+            self.log_area.insert(tk.END, "\n".join(lines) + "\n")
+            excess = int(self.log_area.index("end-1c").split(".")[0]) - 1 - LOG_MAX_LINES
+            if excess > 0:
+                self.log_area.delete("1.0", f"{excess + 1}.0")
+            self.log_area.config(state=tk.DISABLED)
+            self.log_area.yview(tk.END)
+        self.root.after(LOG_FLUSH_INTERVAL, self.flush_log)
\ No newline at end of file
@@ -0,0 +1,156 @@
+# vad.py
+import numpy as np
+
+# Voice activity detection defaults
+FRAME_DURATION = 0.03  # Analysis frame length (in seconds)
+SPEECH_THRESHOLD_DB = -45.0  # Frames louder than this (dBFS) count as speech
+HANGOVER = 0.6  # Silence allowed inside an utterance before it is closed (in seconds)
+MIN_SPEECH = 0.3  # Segments with less speech than this are dropped (in seconds)
+PADDING = 0.2  # Audio kept around each segment (in seconds)
+
+
+def frame_energy_db(samples, frame_length):
+    """Return the RMS level in dBFS of each complete frame, computed in one vectorized pass."""
+    n_frames = len(samples) // frame_length
+    frames = samples[:n_frames * frame_length].reshape(n_frames, frame_length)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def speech_runs(flags):
+    """Return (start, end) frame indices of each run of True values."""
+    edges = np.diff(np.concatenate(([False], flags, [False])).astype(np.int8))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def find_split_points(samples, sample_rate, chunk_seconds, search_seconds=2.0):
+    """Pick split points roughly every `chunk_seconds`, each at the quietest frame within `search_seconds`."""
+    frame_length = int(FRAME_DURATION * sample_rate)
+    energy = frame_energy_db(samples, frame_length)
+    chunk = int(chunk_seconds * sample_rate) // frame_length
+    search = int(search_seconds * sample_rate) // frame_length
+    points = []
+    target = chunk
+    while target + search < len(energy) - chunk // 2:
+        low = target - search
+        best = low + int(np.argmin(energy[low:target + search]))
+        points.append(best * frame_length)
+        target = best + chunk
+    return points
+
+
+def find_speech_bounds(samples, sample_rate, threshold_db=SPEECH_THRESHOLD_DB, min_speech=MIN_SPEECH,
+                       padding=PADDING):
+    """Return (start, end) of a recording with its silent edges trimmed, or None if it holds no speech."""
+    frame_length = int(FRAME_DURATION * sample_rate)
+    speech = np.flatnonzero(frame_energy_db(samples, frame_length) > threshold_db)
+    if len(speech) * frame_length < int(min_speech * sample_rate):
+        return None
+    start = max(0, speech[0] * frame_length - int(padding * sample_rate))
+    end = min(len(samples), (speech[-1] + 1) * frame_length + int(padding * sample_rate))
+    return int(start), int(end)
+
+
+class VADSegmenter:
+    """Cuts a continuous audio stream into speech segments using energy, hangover and minimum-speech rules."""
+
+    def __init__(self, sample_rate=16000, threshold_db=SPEECH_THRESHOLD_DB, hangover=HANGOVER,
+                 min_speech=MIN_SPEECH, padding=PADDING, max_segment=None):
+        self.sample_rate = sample_rate
+        self.frame_length = int(FRAME_DURATION * sample_rate)
+        self.threshold_db = threshold_db
+        self.hangover = int(hangover * sample_rate)
+        self.min_speech = int(min_speech * sample_rate)
+        self.padding = int(padding * sample_rate)
+        self.max_segment = int(max_segment * sample_rate) if max_segment else None
+        self.reset()
+
+    def reset(self, position=0):
+        """Start segmenting a stream whose next sample has absolute index `position`."""
+        self.position = position  # Absolute index of the first sample not yet analysed
+        self.remainder = np.array([], dtype=np.float32)  # Incomplete frame carried to the next call
+        self.segment_start = None  # Absolute start of the open segment
+        self.padded_start = None  # Where the open segment's audio begins, padding included
+        self.speech_end = None  # Absolute end of the last speech frame in the open segment
+        self.speech_samples = 0  # Amount of actual speech in the open segment
+        self.cut_at = None  # Where the last segment was cut at max_segment, if it was
+        self.continued = False  # The open segment carries on from that cut
+
+    def process(self, samples):
+        """Feed the next chunk of the stream; returns a list of closed (start, end) segments."""
+        if len(self.remainder):
+            samples = np.concatenate((self.remainder, samples))
+        n_frames = len(samples) // self.frame_length
+        self.remainder = samples[n_frames * self.frame_length:]
+        base = self.position
+        self.position += n_frames * self.frame_length
+
+        flags = frame_energy_db(samples, self.frame_length) > self.threshold_db
+        starts, ends = speech_runs(flags)
+        closed = []
+
+        for run_start, run_end in zip(starts * self.frame_length + base, ends * self.frame_length + base):
+            if self.segment_start is not None and run_start - self.speech_end > self.hangover:
+                self.close_segment(closed)
+            # A run longer than max_segment is cut inside, however many times it takes
+            while run_start < run_end:
+                if self.segment_start is None:
+                    self.segment_start = run_start
+                    self.continued = self.cut_at is not None and run_start - self.cut_at <= self.hangover
+                    floor = self.cut_at if self.continued else 0
+                    self.padded_start = max(floor, run_start - self.padding)
+                    self.speech_samples = 0
+                piece_end = run_end
+                if self.max_segment:
+                    piece_end = min(run_end, self.padded_start + self.max_segment)
+                self.speech_end = piece_end
+                self.speech_samples += piece_end - run_start
+                run_start = piece_end
+                if self.max_segment and self.speech_end - self.padded_start >= self.max_segment:
+                    self.close_segment(closed, cut=True)
+
+        # Close the open segment once the trailing silence exceeds the hangover
+        if self.segment_start is not None and self.position - self.speech_end > self.hangover:
+            self.close_segment(closed)
+        return closed
+
+    def flush(self):
+        """Close any open segment at the end of the stream."""
+        closed = []
+        if self.segment_start is not None:
+            self.close_segment(closed)
+        return closed
+
+    def close_segment(self, closed, cut=False):
+        """Close the open segment, keeping it only if it has enough speech.
+
+        A segment cut at max_segment ends exactly at the cut and its continuation starts there, so
+        no audio is decoded twice; the continuation is kept however little speech it has.
+        """
+        if self.speech_samples >= self.min_speech or self.continued:
+            end = self.speech_end if cut else min(self.position, self.speech_end + self.padding)
+            closed.append((int(self.padded_start), int(end)))
+        self.cut_at = self.speech_end if cut else None
+        self.segment_start = None
+        self.padded_start = None
+        self.speech_end = None
+        self.speech_samples = 0
+        self.continued = False
+
+
+def segment_array(samples, sample_rate=16000, **kwargs):
+    """Segment a whole recording at once; returns (start, end) sample indices."""
+    segmenter = VADSegmenter(sample_rate, **kwargs)
+    return segmenter.process(np.asarray(samples, dtype=np.float32)) + segmenter.flush()
+
+
+def segment_wav(file_path, **kwargs):
+    """Segment a mono WAV file (e.g. a recorded fixture); returns (start, end) sample indices."""
+    from scipy.io.wavfile import read
+
+    sample_rate, samples = read(file_path)
+    if samples.dtype == np.int16:
+        samples = samples.astype(np.float32) / 32768.0
+    if samples.ndim > 1:
+        samples = samples[:, 0]
+    return segment_array(samples, sample_rate, **kwargs)
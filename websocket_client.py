@@ -1,65 +1,387 @@
 # websocket_client.py
+import collections
+import json
+import os
+import random
 import socketio
 import threading
 import time
+import uuid
 
 # WebSocket URL
 # SERVER_URL = "https://frostingbunbun.ru"
 SERVER_URL = "http://127.0.0.1:5000"
 
+# Reconnect backoff (in seconds)
+RECONNECT_BASE_DELAY = 1.0
+RECONNECT_MAX_DELAY = 30.0
+
+# Outbound queue settings
+MAX_BUFFERED_MESSAGES = 500  # Kept in memory while the link is down; older ones spill to disk if enabled
+BATCH_THRESHOLD = 5  # Backlogs at least this long send their transcriptions in batches (0 disables)
+MAX_BATCH_SIZE = 20
+BATCH_EVENT = "stt_transcription_batch"  # Carries a list of stt_transcription payloads, one per message
+
+# Message protocols: "plain" emits bare strings (what existing servers expect); "v1" emits sequenced,
+# acknowledged payloads as JSON objects, "v1-msgpack" the same payloads msgpack-encoded
+PROTOCOLS = ("plain", "v1", "v1-msgpack")
+PROTOCOL_VERSION = 1
+ACK_TIMEOUT = 30.0  # Emitted payloads not acknowledged within this are forgotten, not resent (in seconds)
+
+# Remote transcription: utterance audio is streamed in chunks of this many bytes (1 s of 16 kHz int16)
+AUDIO_CHUNK_BYTES = 32000
+
 class WebSocketClient:
-    def __init__(self, on_message_callback, log_callback):
-        self.sio = socketio.Client()
-        self.sio.on("stt_transcription_update", on_message_callback)
+    def __init__(self, on_message_callback, log_callback, server_url=SERVER_URL,
+                 max_buffered=MAX_BUFFERED_MESSAGES, spill_file=None, protocol="plain", batch_threshold=BATCH_THRESHOLD):
+        self.server_url = server_url
+        self.sio = socketio.Client(reconnection=False)  # Reconnects are handled by connect_loop
+        self.on_message_callback = on_message_callback
+        self.sio.on("stt_transcription_update", self.on_update)
+        self.sio.on("connect", self.on_connect)
+        self.sio.on("disconnect", self.on_disconnect)
         self.is_connected = False
         self.connection_in_progress = False
+        self.should_connect = False  # False after an explicit disconnect, so drops aren't retried
         self.log_callback = log_callback  # Callback to log messages to the UI
 
+        # Outbound queue: transcriptions wait here until they have been emitted
+        self.outbox = collections.deque()
+        self.replay = collections.deque()  # Sent before the outbox: resends, and spilled messages read back
+        self.max_buffered = max_buffered
+        self.spill_file = spill_file  # Optional JSONL file for messages beyond max_buffered
+        self.spilled = os.path.exists(spill_file) and os.path.getsize(spill_file) > 0 if spill_file else False
+        self.spill_offset = 0  # Where the next window of spilled messages starts
+        self.batch_threshold = batch_threshold
+        self.outbox_lock = threading.Condition()
+        self.init_protocol(protocol)
+        threading.Thread(target=self.sender_loop, daemon=True).start()
+
+    def init_protocol(self, protocol):
+        if protocol not in PROTOCOLS:
+            raise ValueError(f"Unknown message protocol: {protocol}")
+        self.protocol = protocol
+        self.packb = None
+        if protocol == "v1-msgpack":
+            try:
+                import msgpack  # Optional dependency, only needed for the binary encoding
+            except ImportError:
+                raise ValueError("The v1-msgpack protocol needs the msgpack package (pip install msgpack)") from None
+            self.packb = msgpack.packb
+        self.session = uuid.uuid4().hex  # Lets receivers tell clients apart and de-duplicate resends
+        self.seq = 0
+        self.unacked = {}  # seq -> (queued message, perf_counter time it was emitted)
+        self.acks_missing = False  # Logged once, when the first ack times out
+        self.ack_lock = threading.Lock()
+        self.latency_callback = None  # Called with (metric, seconds), e.g. Tracer.observe
+
     def connect_socket(self):
-        """Connect to WebSocket in a separate thread."""
-        def connect_thread():
-            self.connection_in_progress = True  # Set flag to true to prevent reconnection attempts
-
-            attempt_count = 0
-            max_retries = 3  # Maximum number of retry attempts
-
-            while attempt_count < max_retries:
-                try:
-                    # If it's the first connection attempt
-                    if attempt_count == 0:
-                        self.log_callback(f"Attempting to connect to {SERVER_URL}...")
-                    else:
-                        self.log_callback(f"Retrying to connect to {SERVER_URL} (Attempt {attempt_count + 1})...")
-
-                    self.sio.connect(SERVER_URL)
-                    self.is_connected = True
-                    self.connection_in_progress = False  # Reset flag after successful connection
-                    self.log_callback(f"Connected to {SERVER_URL}")
-                    break  # Exit the loop after a successful connection
-                except Exception as e:
-                    self.connection_in_progress = False  # Reset flag even on failure
-                    self.log_callback(f"Connection failed: {e}")
-                    attempt_count += 1
-                    if attempt_count < max_retries:
-                        self.log_callback("Retrying...")
-                        time.sleep(1)  # Wait before retrying
-                    else:
-                        self.log_callback(f"Failed to connect after {max_retries} attempts.")
-                        break
-
-        # Start the connection attempt in a new thread
-        threading.Thread(target=connect_thread, daemon=True).start()
+        """Connect to WebSocket in a separate thread, retrying with jittered exponential backoff."""
+        self.should_connect = True
+        with self.outbox_lock:
+            if self.connection_in_progress or self.is_connected:
+                return  # One connect loop at a time
+            self.connection_in_progress = True
+        threading.Thread(target=self.connect_loop, daemon=True).start()
+
+    def connect_loop(self):
+        attempt_count = 0
+        while self.should_connect:
+            try:
+                # If it's the first connection attempt
+                if attempt_count == 0:
+                    self.log_callback(f"Attempting to connect to {self.server_url}...")
+                else:
+                    self.log_callback(f"Retrying to connect to {self.server_url} (Attempt {attempt_count + 1})...")
+
+                self.sio.connect(self.server_url)
+                self.log_callback(f"Connected to {self.server_url}")
+                break  # Exit the loop after a successful connection
+            except Exception as e:
+                self.log_callback(f"Connection failed: {e}")
+                attempt_count += 1
+                delay = random.uniform(0, min(RECONNECT_MAX_DELAY, RECONNECT_BASE_DELAY * 2 ** attempt_count))
+                self.log_callback(f"Retrying in {delay:.1f}s...")
+                time.sleep(delay)
+        with self.outbox_lock:
+            self.connection_in_progress = False
+
+    def on_connect(self):
+        """Mark the link as up and wake the sender to replay anything buffered."""
+        with self.outbox_lock:
+            self.is_connected = True
+            self.outbox_lock.notify_all()
+
+    def on_disconnect(self, *args):
+        """Mark the link as down and start reconnecting unless the disconnect was requested."""
+        with self.outbox_lock:
+            self.is_connected = False
+            self.requeue_unacked()
+        if self.should_connect:
+            self.log_callback("Lost connection to server, reconnecting...")
+            # The socket.io client is still tearing down on this thread, so connect from a fresh one
+            threading.Timer(RECONNECT_BASE_DELAY, self.connect_socket).start()
 
     def disconnect_socket(self):
         """Disconnect from WebSocket."""
+        self.should_connect = False
         if self.sio.connected:
             self.sio.disconnect()
             self.is_connected = False
             self.log_callback("Disconnected from server")
 
-    def send_message(self, message):
-        """Send a message via WebSocket."""
+    def send_message(self, message, meta=None):
+        """Queue a message; it is sent right away if connected, or replayed in order after a reconnect.
+
+        Plain strings go out as stt_transcription; {"event", "data"} dicts are emitted as their own event.
+        With a v1 protocol, transcriptions become sequenced payloads carrying `meta` (utterance_id, source,
+        captured_at, decoded_at, confidence).
+        """
+        message = self.wrap_message(message, meta)
+        with self.outbox_lock:
+            self.outbox.append(message)
+            if len(self.outbox) > self.max_buffered:
+                self.drop_oldest()
+            if not self.is_connected:
+                self.log_callback(f"Not connected, queued: {message} ({self.backlog()} waiting)")
+            self.outbox_lock.notify_all()
+
+    def drop_oldest(self):
+        """Move the oldest in-memory message to the spill file, or drop it if spilling is disabled."""
+        message = self.outbox.popleft()
+        if self.spill_file:
+            with open(self.spill_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(message) + "\n")
+            self.spilled = True
+        else:
+            self.log_callback(f"Outbound buffer full, dropped: {message}")
+
+    def backlog(self):
+        return len(self.replay) + len(self.outbox) + (1 if self.spilled else 0)
+
+    def restore_spilled(self):
+        """Read the next window of spilled messages (at most max_buffered) into the replay queue.
+
+        Spilled messages are older than anything in the outbox, so they go out first; the file is
+        removed once it has been read to the end.
+        """
+        with open(self.spill_file, "rb") as f:
+            f.seek(self.spill_offset)
+            while len(self.replay) < self.max_buffered:
+                line = f.readline()
+                if not line:
+                    break
+                if line.strip():
+                    self.replay.append(json.loads(line))
+            self.spill_offset = f.tell()
+            exhausted = not f.read(1)
+        if exhausted:
+            os.remove(self.spill_file)
+            self.spill_offset = 0
+            self.spilled = False
+
+    def next_queue(self):
+        """The queue the next message comes from, reading spilled messages back when it is their turn."""
+        if not self.replay and self.spilled:
+            self.restore_spilled()
+        return self.replay or self.outbox
+
+    def wrap_message(self, message, meta=None):
+        """Shape a transcription for the configured protocol; other messages pass through."""
+        if not isinstance(message, str):
+            return message
+        if self.protocol != "plain":
+            return {"event": "stt_transcription", "data": self.make_payload(message, meta)}
+        if meta and meta.get("source"):
+            return f"{meta['source']}: {message}"  # A plain string has nowhere else to carry the speaker
+        return message
+
+    def make_payload(self, text, meta=None):
+        with self.ack_lock:
+            self.seq += 1
+            seq = self.seq
+        payload = {"v": PROTOCOL_VERSION, "session": self.session, "seq": seq, "text": text}
+        payload.update({key: value for key, value in (meta or {}).items() if value is not None})
+        return payload
+
+    def prepare_emit(self, messages, payload):
+        """Stamp and encode sequenced payloads and return the ack callback for them; plain payloads pass through.
+
+        `payload` is a single payload, or the list of them for a batch of `messages`.
+        """
+        payloads = payload if isinstance(payload, list) else [payload]
+        sequenced = []
+        with self.ack_lock:
+            self.expire_unacked()
+            for message, item in zip(messages, payloads):
+                if isinstance(item, dict) and "seq" in item:
+                    item["sent_at"] = time.time()
+                    self.unacked[item["seq"]] = (message, time.perf_counter())
+                    sequenced.append(item)
+        if not sequenced:
+            return payload, None
+        data = payload
+        if self.packb:
+            # Items are packed one by one, so a batch is still a list on the wire
+            data = [self.packb(item) for item in payload] if isinstance(payload, list) else self.packb(payload)
+
+        def callback(*args):
+            for item in sequenced:
+                self.on_ack(item)
+        return data, callback
+
+    def on_ack(self, payload):
+        """The server confirmed a payload: record round-trip and capture-to-server latency."""
+        with self.ack_lock:
+            entry = self.unacked.pop(payload["seq"], None)
+        if entry is None or self.latency_callback is None:
+            return
+        self.latency_callback("ack_rtt", time.perf_counter() - entry[1])
+        if "captured_at" in payload:
+            self.latency_callback("end_to_end", time.time() - payload["captured_at"])
+
+    def expire_unacked(self):
+        """Forget payloads whose ack is overdue; call with ack_lock held.
+
+        A server that ignores acks would otherwise grow `unacked` forever and get every old
+        payload resent on each reconnect.
+        """
+        deadline = time.perf_counter() - ACK_TIMEOUT
+        expired = [seq for seq, (_, emitted_at) in self.unacked.items() if emitted_at < deadline]
+        for seq in expired:
+            del self.unacked[seq]
+        if expired and not self.acks_missing:
+            self.acks_missing = True
+            self.log_callback(f"{len(expired)} messages were not acknowledged within {ACK_TIMEOUT:.0f}s; "
+                              "they will not be resent (does the server call the ack callback?)")
+
+    def requeue_unacked(self):
+        """Put messages that were emitted but never acknowledged back at the front of the outbox."""
+        with self.ack_lock:
+            self.expire_unacked()
+            pending = [message for _, (message, _) in sorted(self.unacked.items())]
+            self.unacked.clear()
+        if pending:
+            self.replay.extendleft(reversed(pending))
+            self.log_callback(f"{len(pending)} unacknowledged messages will be resent.")
+
+    def retry(self, messages):
+        """Put messages whose emit failed back at the front, unless a disconnect already requeued them."""
+        seqs = [payload["seq"] for _, payload in map(self.unwrap, messages)
+                if isinstance(payload, dict) and "seq" in payload]
+        if seqs:
+            with self.ack_lock:
+                if self.unacked.pop(seqs[0], None) is None:
+                    return
+                for seq in seqs[1:]:
+                    self.unacked.pop(seq, None)
+        self.replay.extendleft(reversed(messages))
+
+    def on_update(self, data):
+        """Handle stt_transcription_update; our own v1 payloads coming back measure delivery to listeners."""
+        if isinstance(data, bytes) and self.protocol == "v1-msgpack":
+            import msgpack
+            data = msgpack.unpackb(data)
+        if (isinstance(data, dict) and data.get("session") == self.session and "captured_at" in data
+                and self.latency_callback):
+            self.latency_callback("delivery", time.time() - data["captured_at"])
+        self.on_message_callback(data)
+
+    @staticmethod
+    def unwrap(message):
+        """Return (event, payload) for a queued message."""
+        if isinstance(message, dict):
+            return message["event"], message["data"]
+        return "stt_transcription", message
+
+    def take_next(self):
+        """Pop the next emit off the queues; returns (event, payload, queued messages it covers).
+
+        Once the backlog reaches batch_threshold, consecutive transcriptions go out as one
+        stt_transcription_batch emit whose payload is the list of their payloads, so listeners
+        still see every utterance (and manual text) as its own transcription.
+        """
+        message = self.next_queue().popleft()
+        event, payload = self.unwrap(message)
+        if event != "stt_transcription" or not self.batch_threshold or self.backlog() + 1 < self.batch_threshold:
+            return event, payload, [message]
+        batch = [message]
+        while len(batch) < MAX_BATCH_SIZE:
+            source = self.next_queue()
+            if not source or self.unwrap(source[0])[0] != "stt_transcription":
+                break
+            batch.append(source.popleft())
+        if len(batch) == 1:
+            return event, payload, batch
+        return BATCH_EVENT, [self.unwrap(message)[1] for message in batch], batch
+
+    def log_sent(self, payload):
+        if isinstance(payload, list):
+            text = f"batch of {len(payload)} buffered messages"
+        else:
+            text = payload.get("text", payload) if isinstance(payload, dict) else payload
+        self.log_callback(f"Sent: {text}")
+        print(f"Sent: {text}")
+
+    def sender_loop(self):
+        """Emit queued messages in order while connected, batching large backlogs."""
+        while True:
+            with self.outbox_lock:
+                while not (self.is_connected and self.backlog()):
+                    self.outbox_lock.wait()
+                event, payload, messages = self.take_next()
+
+            try:
+                data, callback = self.prepare_emit(messages, payload)
+                self.sio.emit(event, data, callback=callback)
+            except Exception as e:
+                self.log_callback(f"Send failed ({e}), will retry after reconnecting.")
+                with self.outbox_lock:
+                    self.retry(messages)
+                    self.is_connected = self.sio.connected
+                    if not self.is_connected:
+                        continue
+                time.sleep(RECONNECT_BASE_DELAY)
+                continue
+            self.log_sent(payload)
+
+    def send_partial(self, utterance_id, text):
+        """Send an in-progress transcription that will be replaced by later partials or the final message."""
         if self.is_connected:
-            self.sio.emit("stt_transcription", message)
-            self.log_callback(f"Sent: {message}")
-            print(f"Sent: {message}")
\ No newline at end of file
+            self.sio.emit("stt_partial", {"utterance_id": utterance_id, "text": text})
+
+    def send_event(self, event, data):
+        """Queue a structured event; it keeps its place in order with the plain transcriptions."""
+        self.send_message({"event": event, "data": data})
+
+    def send_draft(self, utterance_id, text):
+        """Send a quick first transcription that a later stt_correction with the same ID may replace."""
+        self.send_event("stt_draft", {"utterance_id": utterance_id, "text": text})
+
+    def send_correction(self, utterance_id, text):
+        """Replace the draft sent earlier for an utterance with the final transcription."""
+        self.send_event("stt_correction", {"utterance_id": utterance_id, "text": text})
+
+    def send_segment(self, utterance_id, index, text):
+        """Send one segment of an utterance that is still being decoded; index counts from 0."""
+        self.send_event("stt_segment", {"utterance_id": utterance_id, "index": index, "text": text})
+
+    def send_segment_end(self, utterance_id, count, text, meta=None):
+        """Mark the end of a streamed utterance: `count` segments were sent, `text` is all of them joined."""
+        data = {"utterance_id": utterance_id, "count": count, "text": text}
+        data.update({key: value for key, value in (meta or {}).items() if value is not None})
+        self.send_event("stt_segment_end", data)
+
+    def send_audio(self, utterance_id, pcm, options):
+        """Stream an utterance's int16 PCM for remote transcription; returns False if the link is down."""
+        if not self.is_connected:
+            return False
+        try:
+            for seq, start in enumerate(range(0, len(pcm), AUDIO_CHUNK_BYTES)):
+                self.sio.emit("stt_audio_chunk", {"utterance_id": utterance_id, "seq": seq,
+                                                  "pcm": pcm[start:start + AUDIO_CHUNK_BYTES]})
+            self.sio.emit("stt_audio_end", {"utterance_id": utterance_id, "options": options})
+        except Exception as e:
+            self.log_callback(f"Sending audio failed: {e}")
+            return False
+        return True